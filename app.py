@@ -7,10 +7,15 @@ from services.sync_service import sync_service
 from services.twilio_service import twilio_service
 import services.email_service as email_service
 from datetime import datetime, timedelta
+import logging
+import orjson
 import pytz
 import requests
 from sqlalchemy import func, and_
 
+# Sync progress goes through logging; no-op if the entry point configured logging already
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
 app = Flask(__name__)
 app.config.from_object(Config)
 
@@ -977,7 +982,7 @@ def get_participant_email_info(participant_id):
 
                 response = requests.post(project_config.api_url, data=data, timeout=30)
                 response.raise_for_status()
-                redcap_data = response.json()
+                redcap_data = orjson.loads(response.content)
 
                 if redcap_data and len(redcap_data) > 0:
                     entry = redcap_data[0]
@@ -1008,7 +1013,7 @@ def get_participant_email_info(participant_id):
                     try:
                         email_response = requests.post(project_config.api_url, data=email_data, timeout=30)
                         email_response.raise_for_status()
-                        email_records = email_response.json()
+                        email_records = orjson.loads(email_response.content)
 
                         if email_records and len(email_records) > 0:
                             email_val = email_records[0].get('email', '').strip()
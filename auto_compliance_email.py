@@ -49,6 +49,7 @@ from datetime import datetime, timedelta
 import pytz
 import os
 import msal
+import orjson
 import requests
 import json
 from dotenv import load_dotenv
@@ -211,7 +212,7 @@ def get_redcap_participant_data():
         try:
             response = requests.post(project_config.api_url, data=data, timeout=30)
             response.raise_for_status()
-            redcap_data = response.json()
+            redcap_data = orjson.loads(response.content)
 
             for entry in redcap_data:
                 record_id = entry.get('record_id')
@@ -251,7 +252,7 @@ def get_redcap_participant_data():
                 try:
                     email_response = requests.post(project_config.api_url, data=email_data, timeout=30)
                     email_response.raise_for_status()
-                    email_records = email_response.json()
+                    email_records = orjson.loads(email_response.content)
 
                     email_count = 0
                     for email_entry in email_records:
@@ -392,19 +393,20 @@ def create_never_logged_in_email_body(first_name, ra_first_name, username, passw
     )
 
 
-def check_user_has_logged_in(firebase_id):
+def get_login_statuses(firebase_ids):
     """
-    Check if a user has ever logged into Firebase.
-    Returns True if logged in, False if never logged in, None if error/not found.
+    Check whether users have ever logged into Firebase, in batched Auth lookups.
+    Returns a dict of firebase_id -> True if logged in, False if never logged in,
+    None if error/not found. Placeholder IDs are left out (they map to None on lookup).
     """
-    if not firebase_id or firebase_id.startswith('redcap_'):
-        # Placeholder IDs can't have login history
-        return None
+    real_ids = [fid for fid in firebase_ids if fid and not fid.startswith('redcap_')]
+    if not real_ids:
+        return {}
     try:
-        return firebase_service.has_user_ever_logged_in(firebase_id)
+        return firebase_service.has_users_logged_in(real_ids)
     except Exception as e:
-        print(f"  [ERROR] Failed to check login status for {firebase_id}: {e}")
-        return None
+        print(f"  [ERROR] Failed to check login status: {e}")
+        return {}
 
 
 def get_access_token():
@@ -489,7 +491,7 @@ def send_email(to_email, subject, html_body, dry_run=False):
             'Content-Type': 'application/json'
         }
 
-        response = requests.post(endpoint, headers=headers, json=email_data)
+        response = requests.post(endpoint, headers=headers, data=orjson.dumps(email_data))
 
         if response.status_code == 202:
             print(f"  [SENT] OAuth Email sent successfully to {to_email}")
@@ -575,6 +577,14 @@ def run_compliance_check(lookback_days=None, dry_run=None, test_email=None):
     # Build a mapping of redcap_id to user
     users_by_redcap_id = {user.redcap_id: user for user in users if user.redcap_id}
 
+    # Look up Firebase login history for everyone up front, in batches
+    print("Checking Firebase login history...")
+    login_statuses = get_login_statuses(
+        [p['firebase_id'] for p in redcap_participants.values()] +
+        [user.firebase_id for user in users]
+    )
+    print()
+
     # Track statistics
     stats = {
         'total_checked': 0,
@@ -651,7 +661,7 @@ def run_compliance_check(lookback_days=None, dry_run=None, test_email=None):
 
         # Check if user has ever logged in to Firebase
         firebase_id = participant['firebase_id'] or user.firebase_id
-        has_logged_in = check_user_has_logged_in(firebase_id)
+        has_logged_in = login_statuses.get(firebase_id)
 
         if has_logged_in is False:
             # User has never logged in - send credentials email
@@ -18,6 +18,7 @@ See .env.example for a complete list of configuration options.
 
 import os
 import json
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -66,6 +67,16 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///theradash.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool: keep warm connections for the sync's many short transactions and
+    # drop ones the server closed. In-memory SQLite uses a single static connection, so
+    # only the liveness options apply there.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+    if ':memory:' not in SQLALCHEMY_DATABASE_URI:
+        SQLALCHEMY_ENGINE_OPTIONS.update(pool_size=10, max_overflow=20)
+
     # Firebase settings (shared across all projects)
     FIREBASE_CREDENTIALS_PATH = os.environ.get('FIREBASE_CREDENTIALS_PATH')
 
@@ -145,6 +156,8 @@ class Config:
     USER_SELECTION_MODE = os.environ.get('USER_SELECTION_MODE', 'redcap')
     # Comma-separated list of Firebase UIDs to monitor (used when mode is 'uids' or 'both')
     FIREBASE_UIDS = [uid.strip() for uid in os.environ.get('FIREBASE_UIDS', '').split(',') if uid.strip()]
+    # Lock file that keeps scheduled and manual syncs from running at the same time
+    SYNC_LOCK_PATH = os.environ.get('SYNC_LOCK_PATH') or os.path.join(tempfile.gettempdir(), 'theradash_sync.lock')
 
     # Twilio settings
     TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
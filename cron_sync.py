@@ -12,12 +12,24 @@ Cron schedule example (every 2 minutes):
 
 import sys
 import os
+import logging
+from logging.handlers import MemoryHandler
 from datetime import datetime
 
 # Add the project directory to the path
 project_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_dir)
 
+# Buffer sync log records and write them to stdout in batches (errors flush immediately).
+# Configured before importing app so its basicConfig call is a no-op.
+log_handler = MemoryHandler(
+    1024,
+    flushLevel=logging.ERROR,
+    target=logging.StreamHandler(sys.stdout)
+)
+log_handler.target.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[log_handler])
+
 # Import app and required services
 from app import app
 from services.sync_service import sync_service
@@ -32,6 +44,7 @@ def main():
         # Run sync within Flask app context
         with app.app_context():
             result = sync_service.full_sync()
+            log_handler.flush()
 
             if result['success']:
                 print(f"\n✓ Sync completed successfully!")
@@ -51,6 +64,7 @@ def main():
         traceback.print_exc()
         return 1
     finally:
+        log_handler.flush()
         print(f"\n{'='*80}")
         print(f"Sync finished at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"{'='*80}\n")
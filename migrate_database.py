@@ -19,10 +19,15 @@ Columns (added if missing):
 - users.redcap_firebase_id: Display ID from REDCap
 - users.project_id: Multi-project support
 - users.study_start_date, users.study_end_date: Study dates
+- users.redcap_content_hash: Digest of the last synced REDCap record
+- users.last_message_ts: Newest synced message timestamp (indexed)
 - admins.is_approved: Admin approval workflow
 - conversations.timestamp: Made nullable (messages have their own timestamps)
 - messages.is_risky: Risk flag (migrates from risk_score if exists)
 
+Indexes:
+- user_custom_fields.idx_user_field: Made unique (removes duplicate rows first)
+
 Usage:
     python migrate_database.py
 
@@ -92,7 +97,7 @@ def create_user_custom_fields_table(conn, inspector):
         )
     '''))
     conn.execute(text('CREATE INDEX idx_user_custom_fields_user_id ON user_custom_fields(user_id)'))
-    conn.execute(text('CREATE INDEX idx_user_field ON user_custom_fields(user_id, field_name)'))
+    conn.execute(text('CREATE UNIQUE INDEX idx_user_field ON user_custom_fields(user_id, field_name)'))
     print("  [CREATE] user_custom_fields table created successfully")
     return True
 
@@ -175,6 +180,15 @@ def migrate_users_table(conn, inspector):
     if add_column_if_missing(conn, 'users', 'study_end_date', 'DATE', columns):
         migrations_applied += 1
 
+    # Migration 7: redcap_content_hash field (incremental REDCap sync)
+    if add_column_if_missing(conn, 'users', 'redcap_content_hash', 'VARCHAR(32)', columns):
+        migrations_applied += 1
+
+    # Migration 8: last_message_ts field (incremental UID message sync)
+    if add_column_if_missing(conn, 'users', 'last_message_ts', 'DATETIME', columns):
+        conn.execute(text('CREATE INDEX IF NOT EXISTS ix_users_last_message_ts ON users(last_message_ts)'))
+        migrations_applied += 1
+
     if migrations_applied > 0:
         print(f"  Applied {migrations_applied} migration(s) to users table")
     else:
@@ -269,6 +283,33 @@ def migrate_conversations_table(conn, inspector):
     return True
 
 
+def migrate_user_custom_fields_table(conn, inspector):
+    """Make idx_user_field unique so custom fields can be upserted."""
+    print("\n--- User Custom Fields Table Migrations ---")
+
+    result = conn.execute(text("SELECT sql FROM sqlite_master WHERE type='index' AND name='idx_user_field'"))
+    row = result.fetchone()
+    if row and row[0] and 'UNIQUE' in row[0].upper():
+        print("  [SKIP] idx_user_field is already unique")
+        return True
+
+    # Keep the most recent row for each (user_id, field_name) pair
+    print("  [DATA] Removing duplicate custom field rows...")
+    result = conn.execute(text('''
+        DELETE FROM user_custom_fields
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM user_custom_fields GROUP BY user_id, field_name
+        )
+    '''))
+    print(f"  [DATA] Removed {result.rowcount} duplicate row(s)")
+
+    print("  [MIGRATE] Making idx_user_field unique...")
+    conn.execute(text('DROP INDEX IF EXISTS idx_user_field'))
+    conn.execute(text('CREATE UNIQUE INDEX idx_user_field ON user_custom_fields(user_id, field_name)'))
+    print("  [MIGRATE] idx_user_field is now unique")
+    return True
+
+
 def migrate_messages_table(conn, inspector):
     """Apply all migrations to the messages table."""
     print("\n--- Messages Table Migrations ---")
@@ -322,13 +363,15 @@ def run_migrations():
             users_ok = migrate_users_table(conn, inspector)
             admins_ok = migrate_admins_table(conn, inspector)
             conversations_ok = migrate_conversations_table(conn, inspector)
+            custom_fields_index_ok = migrate_user_custom_fields_table(conn, inspector)
             messages_ok = migrate_messages_table(conn, inspector)
 
             # Commit all changes
             conn.commit()
 
         print("\n" + "=" * 60)
-        all_ok = redcap_ok and custom_fields_ok and notes_ok and users_ok and admins_ok and conversations_ok and messages_ok
+        all_ok = (redcap_ok and custom_fields_ok and notes_ok and users_ok and admins_ok and conversations_ok
+                  and custom_fields_index_ok and messages_ok)
         if all_ok:
             print("Migration completed successfully!")
             print("\nNext steps:")
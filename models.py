@@ -1,11 +1,30 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import sqlite3
 
 db = SQLAlchemy()
 
 
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune SQLite connections for bursty sync writes: WAL lets the dashboard read while a
+    sync commits, and synchronous=NORMAL skips the per-commit fsync (still durable under WAL).
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+    cursor.close()
+
+
 class Admin(UserMixin, db.Model):
     """Admin user model for authentication"""
     __tablename__ = 'admins'
@@ -76,6 +95,12 @@ class User(db.Model):
     dropped = db.Column(db.Boolean, default=False)
     dropped_surveys = db.Column(db.Boolean, default=False)
 
+    # Digest of the REDCap record last written to this user (lets sync skip unchanged participants)
+    redcap_content_hash = db.Column(db.String(32))
+
+    # Timestamp of the newest Firebase message synced for this user (UID-mode resume point)
+    last_message_ts = db.Column(db.DateTime, index=True)
+
     # Relationships
     conversations = db.relationship('Conversation', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     messages = db.relationship('Message', backref='user', lazy='dynamic', cascade='all, delete-orphan')
@@ -96,9 +121,9 @@ class UserCustomField(db.Model):
     field_value = db.Column(db.Text)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
 
-    # Composite index for efficient lookups
+    # One value per field per user; also the conflict target for sync upserts
     __table_args__ = (
-        db.Index('idx_user_field', 'user_id', 'field_name'),
+        db.Index('idx_user_field', 'user_id', 'field_name', unique=True),
     )
 
     def __repr__(self):
@@ -8,8 +8,8 @@ with study participants. It uses Microsoft Graph API (OAuth2) for sending emails
 import os
 import re
 import msal
+import orjson
 import requests
-import json
 from datetime import datetime
 
 # OAuth2 settings (same as auto_compliance_email.py)
@@ -19,6 +19,10 @@ AUTHORITY = f'https://login.microsoftonline.com/{TENANT_ID}'
 SCOPES = ['https://graph.microsoft.com/Mail.Send']
 CACHE_FILE = 'token_cache.bin'
 
+# Shared HTTP session for Graph API calls (keep-alive, compressed responses)
+_SESSION = requests.Session()
+_SESSION.headers.update({'Accept-Encoding': 'gzip, deflate, br', 'User-Agent': 'Everdash/1.0'})
+
 # Email templates for manual sending
 EMAIL_TEMPLATES = {
     'great_job': {
@@ -104,6 +108,20 @@ Our Lab's Website: https://geiselmed.dartmouth.edu/jacobsonlab/
     }
 }
 
+# Template views derived once from the constant above; callers get shared,
+# read-only data rather than a rebuilt list on every request
+_TEMPLATES_VIEW = tuple(
+    {
+        'id': key,
+        'name': template['name'],
+        'subject': template['subject'],
+        'description': template['description']
+    }
+    for key, template in EMAIL_TEMPLATES.items()
+)
+_TEMPLATE_BODIES = {key: template['body'] for key, template in EMAIL_TEMPLATES.items()}
+_TEMPLATE_SUBJECTS = {key: template['subject'] for key, template in EMAIL_TEMPLATES.items()}
+
 # Email from address
 EMAIL_FROM_ADDRESS = os.environ.get('EMAIL_FROM_ADDRESS', 'therabot@dartmouth.edu')
 
@@ -173,7 +191,7 @@ def send_email(to_email, subject, html_body):
             'Content-Type': 'application/json'
         }
 
-        response = requests.post(endpoint, headers=headers, json=email_data)
+        response = _SESSION.post(endpoint, headers=headers, data=orjson.dumps(email_data))
 
         if response.status_code == 202:
             return True, "Email sent successfully"
@@ -186,29 +204,17 @@ def send_email(to_email, subject, html_body):
 
 def get_email_templates():
     """Return available email templates."""
-    templates = []
-    for key, template in EMAIL_TEMPLATES.items():
-        templates.append({
-            'id': key,
-            'name': template['name'],
-            'subject': template['subject'],
-            'description': template['description']
-        })
-    return templates
+    return _TEMPLATES_VIEW
 
 
 def get_template_body(template_id):
     """Get the body of a specific template."""
-    if template_id in EMAIL_TEMPLATES:
-        return EMAIL_TEMPLATES[template_id]['body']
-    return None
+    return _TEMPLATE_BODIES.get(template_id)
 
 
 def get_template_subject(template_id):
     """Get the subject of a specific template."""
-    if template_id in EMAIL_TEMPLATES:
-        return EMAIL_TEMPLATES[template_id]['subject']
-    return None
+    return _TEMPLATE_SUBJECTS.get(template_id)
 
 
 def format_email_body(template_id, first_name, ra_first_name, username=None, password=None, custom_message=None):
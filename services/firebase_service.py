@@ -1,22 +1,98 @@
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
+from google.api_core.exceptions import FailedPrecondition
+from functools import cached_property
 from datetime import datetime
 import pytz
 from config import Config
 
 
-class FirebaseService:
-    """Service for interacting with Firebase Firestore"""
+# Documents fetched per round-trip when paging through large collections
+FIRESTORE_PAGE_SIZE = 1000
 
-    def __init__(self):
-        self.db = None
-        self.initialized = False
+# Maximum identifiers accepted by a single auth.get_users() call
+AUTH_BATCH_SIZE = 100
 
-    def initialize(self):
-        """Initialize Firebase Admin SDK"""
-        if self.initialized:
+
+def _iter_dicts(docs, id_field):
+    """Lazily convert Firestore document snapshots to dicts tagged with their document ID"""
+    def _enrich(doc):
+        data = doc.to_dict()
+        data[id_field] = doc.id
+        return data
+
+    # map() with a local function keeps the per-document work out of the loop body
+    return map(_enrich, docs)
+
+
+def _docs_to_dicts(docs, id_field):
+    """Convert Firestore document snapshots to a list of dicts tagged with their document ID"""
+    return list(_iter_dicts(docs, id_field))
+
+
+def _paginate(query, order_field, page_size=FIRESTORE_PAGE_SIZE):
+    """
+    Yield the documents of a query page by page, ordered server-side by order_field.
+    Each page resumes after the last document of the previous one, so memory and
+    per-request cost stay bounded no matter how far behind a sync is.
+    """
+    query = query.order_by(order_field).limit(page_size)
+    last_doc = None
+
+    while True:
+        page_query = query.start_after(last_doc) if last_doc is not None else query
+        page = list(page_query.stream())
+        yield from page
+
+        if len(page) < page_size:
             return
+        last_doc = page[-1]
+
+
+def _project(query, fields):
+    """
+    Restrict a query to the given document fields.
+
+    Projection trades completeness for transfer size: callers only get the
+    listed fields back (the document ID is always available), so pass a
+    field list only when the consumer is known to read nothing else.
+    """
+    if fields:
+        return query.select(fields)
+    return query
 
+
+def _order_field(since_timestamp):
+    """
+    Field to page on. A timestamp range filter requires ordering by timestamp;
+    unfiltered fetches page by document ID so documents without a timestamp
+    are not dropped by the ordering.
+    """
+    if since_timestamp:
+        return 'timestamp'
+    return firestore.FieldPath.document_id()
+
+
+def _as_utc(timestamp):
+    """Treat naive datetimes (as stored locally) as UTC so they compare with Firestore's"""
+    if timestamp.tzinfo is None:
+        return pytz.utc.localize(timestamp)
+    return timestamp
+
+
+class FirebaseService:
+    """Service for interacting with Firebase Firestore"""
+
+    # Set once a (userID, timestamp) messages query fails because the composite index
+    # from firestore.indexes.json is not deployed, so later calls skip straight to the fallback
+    _user_timestamp_index_missing = False
+
+    @cached_property
+    def db(self):
+        """
+        Firestore client. The Firebase Admin SDK is initialized on first access
+        and the client cached, so methods use self.db without an init check.
+        """
         try:
             if Config.FIREBASE_CREDENTIALS_PATH:
                 cred = credentials.Certificate(Config.FIREBASE_CREDENTIALS_PATH)
@@ -25,87 +101,79 @@ class FirebaseService:
                 # Use default credentials (e.g., in GCP environment)
                 firebase_admin.initialize_app()
 
-            self.db = firestore.client()
-            self.initialized = True
+            client = firestore.client()
             print("Firebase initialized successfully")
+            return client
         except Exception as e:
             print(f"Error initializing Firebase: {e}")
             raise
 
-    def get_users(self):
-        """Fetch all users from Firebase"""
-        if not self.initialized:
-            self.initialize()
-
-        users_ref = self.db.collection('users')
-        users = []
+    def initialize(self):
+        """Initialize Firebase Admin SDK eagerly (otherwise done on first use)"""
+        return self.db
 
-        try:
-            for doc in users_ref.stream():
-                user_data = doc.to_dict()
-                user_data['firebase_id'] = doc.id
-                users.append(user_data)
-        except Exception as e:
-            print(f"Error fetching users: {e}")
-            raise
+    def get_users(self, fields=None):
+        """
+        Fetch all users from Firebase, optionally projected to the given fields.
+        Returns a generator that pages through the collection as it is consumed.
+        """
+        users_ref = _project(self.db.collection('users'), fields)
+        yield from _iter_dicts(_paginate(users_ref, _order_field(None)), 'firebase_id')
 
-        return users
+    def get_users_list(self, fields=None):
+        """Fetch all users from Firebase as a list"""
+        return list(self.get_users(fields=fields))
 
     def get_conversations_since(self, since_timestamp=None):
-        """Fetch conversations from Firebase, optionally since a specific timestamp"""
-        if not self.initialized:
-            self.initialize()
-
+        """
+        Fetch conversations from Firebase, optionally since a specific timestamp.
+        Returns a generator that pages through the results as it is consumed.
+        """
         convos_ref = self.db.collection('convos')
 
         if since_timestamp:
             convos_ref = convos_ref.where('timestamp', '>', since_timestamp)
 
-        conversations = []
+        yield from _iter_dicts(
+            _paginate(convos_ref, _order_field(since_timestamp)),
+            'firebase_convo_id'
+        )
 
-        try:
-            for doc in convos_ref.stream():
-                convo_data = doc.to_dict()
-                convo_data['firebase_convo_id'] = doc.id
-                conversations.append(convo_data)
-        except Exception as e:
-            print(f"Error fetching conversations: {e}")
-            raise
-
-        return conversations
+    def get_conversations_since_list(self, since_timestamp=None):
+        """Fetch conversations from Firebase as a list"""
+        return list(self.get_conversations_since(since_timestamp))
 
-    def get_messages_since(self, since_timestamp=None):
+    def get_messages_since(self, since_timestamp=None, fields=None):
         """
         Fetch messages from Firebase, optionally since a specific timestamp.
         This is the critical method to only pull new messages.
-        """
-        if not self.initialized:
-            self.initialize()
+        If fields is provided, only those document fields are fetched.
 
+        Returns a generator: messages are fetched a page at a time as the caller
+        iterates, so a large catch-up never has to fit in memory at once.
+        """
         messages_ref = self.db.collection('messages')
 
         if since_timestamp:
             # Only fetch messages after the last sync timestamp
             messages_ref = messages_ref.where('timestamp', '>', since_timestamp)
+            # Page cursors resume from the timestamp, so it must be in the projection
+            if fields and 'timestamp' not in fields:
+                fields = list(fields) + ['timestamp']
 
-        messages = []
+        messages_ref = _project(messages_ref, fields)
 
-        try:
-            for doc in messages_ref.stream():
-                message_data = doc.to_dict()
-                message_data['firebase_message_id'] = doc.id
-                messages.append(message_data)
-        except Exception as e:
-            print(f"Error fetching messages: {e}")
-            raise
+        yield from _iter_dicts(
+            _paginate(messages_ref, _order_field(since_timestamp)),
+            'firebase_message_id'
+        )
 
-        return messages
+    def get_messages_since_list(self, since_timestamp=None, fields=None):
+        """Fetch messages from Firebase as a list"""
+        return list(self.get_messages_since(since_timestamp, fields=fields))
 
     def get_user_by_id(self, firebase_id):
         """Fetch a specific user by Firebase ID"""
-        if not self.initialized:
-            self.initialize()
-
         try:
             user_ref = self.db.collection('users').document(firebase_id)
             user_doc = user_ref.get()
@@ -121,9 +189,6 @@ class FirebaseService:
 
     def get_conversation_by_id(self, convo_id):
         """Fetch a specific conversation by ID"""
-        if not self.initialized:
-            self.initialize()
-
         try:
             convo_ref = self.db.collection('convos').document(convo_id)
             convo_doc = convo_ref.get()
@@ -137,52 +202,63 @@ class FirebaseService:
             print(f"Error fetching conversation {convo_id}: {e}")
             raise
 
-    def get_messages_for_conversation(self, convo_id):
-        """Fetch all messages for a specific conversation"""
-        if not self.initialized:
-            self.initialize()
-
+    def get_messages_for_conversation(self, convo_id, fields=None):
+        """Fetch all messages for a specific conversation, optionally projected to the given fields"""
         messages_ref = self.db.collection('messages').where('convoID', '==', convo_id)
-        messages = []
+        messages_ref = _project(messages_ref, fields)
 
         try:
-            for doc in messages_ref.stream():
-                message_data = doc.to_dict()
-                message_data['firebase_message_id'] = doc.id
-                messages.append(message_data)
+            return _docs_to_dicts(messages_ref.stream(), 'firebase_message_id')
         except Exception as e:
             print(f"Error fetching messages for conversation {convo_id}: {e}")
             raise
 
-        return messages
-
-    def get_messages_for_user(self, user_firebase_id, since_timestamp=None):
-        """Fetch all messages for a specific user, optionally since a specific timestamp"""
-        if not self.initialized:
-            self.initialize()
+    def get_messages_for_user(self, user_firebase_id, since_timestamp=None, fields=None):
+        """
+        Fetch all messages for a specific user, optionally since a specific timestamp.
+        If fields is provided, only those document fields are fetched.
+        """
+        if since_timestamp and self._user_timestamp_index_missing:
+            return self._get_messages_for_user_after(user_firebase_id, since_timestamp, fields)
 
         messages_ref = self.db.collection('messages').where('userID', '==', user_firebase_id)
 
         if since_timestamp:
+            # Needs the composite (userID, timestamp) index from firestore.indexes.json
             messages_ref = messages_ref.where('timestamp', '>', since_timestamp)
 
-        messages = []
+        messages_ref = _project(messages_ref, fields)
 
         try:
-            for doc in messages_ref.stream():
-                message_data = doc.to_dict()
-                message_data['firebase_message_id'] = doc.id
-                messages.append(message_data)
+            return _docs_to_dicts(messages_ref.stream(), 'firebase_message_id')
+        except FailedPrecondition as e:
+            if not since_timestamp:
+                print(f"Error fetching messages for user {user_firebase_id}: {e}")
+                raise
+            print(f"Firestore index on messages (userID, timestamp) is missing, filtering by timestamp locally: {e}")
+            FirebaseService._user_timestamp_index_missing = True
+            return self._get_messages_for_user_after(user_firebase_id, since_timestamp, fields)
         except Exception as e:
             print(f"Error fetching messages for user {user_firebase_id}: {e}")
             raise
 
-        return messages
+    def _get_messages_for_user_after(self, user_firebase_id, since_timestamp, fields=None):
+        """
+        get_messages_for_user without the composite index: fetch the user's messages with
+        the single-field userID filter and keep those newer than since_timestamp.
+        """
+        if fields and 'timestamp' not in fields:
+            fields = list(fields) + ['timestamp']
+        since_timestamp = _as_utc(since_timestamp)
+        return [
+            message for message in self.get_messages_for_user(user_firebase_id, fields=fields)
+            if message.get('timestamp') and _as_utc(message['timestamp']) > since_timestamp
+        ]
 
     def get_auth_user(self, firebase_id):
         """Fetch user authentication data from Firebase Authentication"""
-        if not self.initialized:
-            self.initialize()
+        # Firebase Auth needs the Admin SDK app, which is set up with the client
+        self.initialize()
 
         try:
             user_record = auth.get_user(firebase_id)
@@ -207,8 +283,7 @@ class FirebaseService:
         Returns True if user has logged in at least once, False if never logged in,
         or None if user not found or error occurred.
         """
-        if not self.initialized:
-            self.initialize()
+        self.initialize()
 
         try:
             user_record = auth.get_user(firebase_id)
@@ -222,6 +297,35 @@ class FirebaseService:
             print(f"Error checking login status for {firebase_id}: {e}")
             return None
 
+    def has_users_logged_in(self, firebase_ids):
+        """
+        Batched has_user_ever_logged_in: looks up to AUTH_BATCH_SIZE users per
+        Firebase Auth request. Returns a dict mapping each firebase_id to True/False,
+        or None if the user was not found or the lookup failed.
+        """
+        self.initialize()
+
+        unique_ids = list(dict.fromkeys(firebase_ids))
+        results = {}
+
+        for start in range(0, len(unique_ids), AUTH_BATCH_SIZE):
+            chunk = unique_ids[start:start + AUTH_BATCH_SIZE]
+            try:
+                result = auth.get_users([auth.UidIdentifier(uid) for uid in chunk])
+            except Exception as e:
+                print(f"Error checking login status for {len(chunk)} users: {e}")
+                results.update(dict.fromkeys(chunk))
+                continue
+
+            for user_record in result.users:
+                # user_metadata.last_sign_in_timestamp is None if user has never signed in
+                results[user_record.uid] = user_record.user_metadata.last_sign_in_timestamp is not None
+            for identifier in result.not_found:
+                print(f"Authentication user {identifier.uid} not found")
+                results[identifier.uid] = None
+
+        return results
+
 
 # Singleton instance
 firebase_service = FirebaseService()
@@ -1,6 +1,34 @@
+import logging
+import ijson
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import Config, REDCapProjectConfig
 
+logger = logging.getLogger(__name__)
+
+# Shared HTTP session so REDCap calls reuse pooled keep-alive connections.
+# Advertising brotli (decoded via the brotli package) on top of gzip/deflate
+# lets large JSON exports travel compressed.
+_SESSION = requests.Session()
+_SESSION.headers.update({'Accept-Encoding': 'gzip, deflate, br', 'User-Agent': 'Everdash/1.0'})
+
+# Keep enough pooled connections for several projects, and retry transient failures.
+# Every call here is a record export, so retrying the POST is safe.
+_REDCAP_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['POST'])
+    )
+)
+_SESSION.mount('https://', _REDCAP_ADAPTER)
+_SESSION.mount('http://', _REDCAP_ADAPTER)
+
 
 class REDCapService:
     """Service for interacting with REDCap API - supports multiple projects"""
@@ -73,13 +101,18 @@ class REDCapService:
         # Only add event if specified (for longitudinal projects)
         if self.event_name:
             data['events'] = self.event_name
-        print(data)
 
-        try:
-            response = requests.post(self.api_url, data=data, timeout=30)
-            response.raise_for_status()
+        # Lazy %-formatting: nothing is stringified unless debug logging is on
+        logger.debug("REDCap request fields=%s filterLogic=%s events=%s",
+                     data['fields'], data['filterLogic'], data.get('events'))
 
-            participants = response.json()
+        try:
+            # Stream the export and parse records incrementally, so a large
+            # response is never held as raw text and parsed objects at once
+            with _SESSION.post(self.api_url, data=data, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                participants = list(ijson.items(response.raw, 'item'))
 
             # Attach project info to each participant
             if self.project_config:
@@ -88,7 +121,6 @@ class REDCapService:
                     p['_project_name'] = self.project_config.name
 
             print(f"Fetched {len(participants)} participants from REDCap (filter: {self.filter_logic})")
-            print(participants)
             return participants
 
         except requests.exceptions.RequestException as e:
@@ -119,11 +151,11 @@ class REDCapService:
             data['events'] = self.event_name
 
         try:
-            response = requests.post(self.api_url, data=data, timeout=30)
+            response = _SESSION.post(self.api_url, data=data, timeout=30)
             response.raise_for_status()
 
-            participants = response.json()
-            print(participants)
+            participants = orjson.loads(response.content)
+            logger.debug("Received %d participant records from REDCap", len(participants))
 
             # Extract firebase_id values using the configurable field name
             firebase_ids = []
@@ -156,10 +188,10 @@ class REDCapService:
         }
 
         try:
-            response = requests.post(self.api_url, data=data, timeout=30)
+            response = _SESSION.post(self.api_url, data=data, timeout=30)
             response.raise_for_status()
 
-            participants = response.json()
+            participants = orjson.loads(response.content)
 
             if participants and len(participants) > 0:
                 return participants[0]
@@ -172,9 +204,43 @@ class REDCapService:
     def validate_participant(self, firebase_id):
         """
         Check if a participant with given firebase_id is active in REDCap.
+        Asks REDCap for just that participant (active filter AND matching firebase_id)
+        instead of exporting every active participant.
         """
-        active_participants = self.get_active_participants()
-        return firebase_id in active_participants
+        if not self.api_url or not self.api_token:
+            print("Warning: REDCap credentials not configured")
+            return False
+
+        # firebase_id is a field, not the REDCap record ID, so narrow with filterLogic
+        # rather than the 'records' parameter
+        participant_filter = f'[{self.firebase_id_field}] = "{firebase_id}"'
+        if self.filter_logic:
+            participant_filter = f'({self.filter_logic}) and {participant_filter}'
+
+        data = {
+            'token': self.api_token,
+            'content': 'record',
+            'format': 'json',
+            'type': 'flat',
+            'fields': self.firebase_id_field,
+            'filterLogic': participant_filter,
+            'returnFormat': 'json'
+        }
+
+        # Only add event if specified (for longitudinal projects)
+        if self.event_name:
+            data['events'] = self.event_name
+
+        try:
+            response = _SESSION.post(self.api_url, data=data, timeout=30)
+            response.raise_for_status()
+
+            participants = orjson.loads(response.content)
+            return any(p.get(self.firebase_id_field) == firebase_id for p in participants)
+
+        except requests.exceptions.RequestException as e:
+            print(f"Error validating participant {firebase_id}: {e}")
+            raise
 
 
 class REDCapServiceManager:
@@ -183,6 +249,19 @@ class REDCapServiceManager:
     def __init__(self):
         self._services = {}
 
+        # Seed the cache with the default (first) project so the backward-compatible
+        # module-level service and the manager share one instance
+        projects = Config.get_all_projects()
+        if projects:
+            self._services[projects[0].id] = REDCapService(projects[0])
+
+    def get_default_service(self):
+        """Get the service for the first configured project (or an unconfigured one)"""
+        projects = Config.get_all_projects()
+        if projects:
+            return self.get_service(projects[0].id)
+        return REDCapService()
+
     def get_service(self, project_id):
         """Get or create a REDCapService for a specific project"""
         if project_id not in self._services:
@@ -227,5 +306,5 @@ class REDCapServiceManager:
 # Singleton instances
 redcap_service_manager = REDCapServiceManager()
 
-# For backward compatibility - returns service for first/default project
-redcap_service = REDCapService()
+# For backward compatibility - the manager's service for the first/default project
+redcap_service = redcap_service_manager.get_default_service()
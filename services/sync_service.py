@@ -31,11 +31,147 @@ Last Updated: October 2025
 
 from models import db, User, Conversation, Message, SyncLog, REDCapProject, UserCustomField
 from services.firebase_service import firebase_service
-from services.redcap_service import redcap_service, REDCapService
+from services.redcap_service import redcap_service, redcap_service_manager, REDCapService
 from services.twilio_service import twilio_service
-from datetime import datetime
+from sqlalchemy import bindparam, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from functools import lru_cache
 from config import Config
+import fcntl
+import hashlib
+import json
+import logging
 import pytz
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Firestore fields read by the sync. Fetches are projected to these so that wide
+# user/message documents don't inflate every query; extend the lists when the
+# sync starts reading another field.
+FIREBASE_USER_FIELDS = ['convoID', 'isAnimate', 'isDark']
+FIREBASE_MESSAGE_FIELDS = ['convoID', 'userID', 'text', 'timestamp', 'riskScore']
+
+# SQLite caps the number of bound parameters per statement (999 on older
+# builds), so IN (...) lookups are issued in chunks of this size
+IN_CLAUSE_CHUNK_SIZE = 500
+
+# Rows per executemany INSERT when bulk-writing messages
+INSERT_BATCH_SIZE = 1000
+
+# INSERT constructs supporting ON CONFLICT upserts, by dialect name
+UPSERT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+# Seconds a cached last-sync timestamp is trusted before re-reading sync_logs
+LAST_SYNC_CACHE_TTL = 30
+
+# Concurrent Firebase Auth lookups; each one is a blocking network round-trip
+AUTH_LOOKUP_WORKERS = 20
+
+# Concurrent per-user Firestore message fetches in UID mode
+MESSAGE_FETCH_WORKERS = 10
+
+# Concurrent Firestore reads in full_sync (users, conversations, messages)
+FIREBASE_FETCH_WORKERS = 3
+
+
+def _chunked(values, size=IN_CLAUSE_CHUNK_SIZE):
+    """Split values into lists of at most size items"""
+    values = list(values)
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def _select_in_chunks(columns, key_column, values):
+    """Rows of columns whose key_column is in values, fetched with chunked IN queries"""
+    rows = []
+    for chunk in _chunked({value for value in values if value}):
+        rows.extend(db.session.query(*columns).filter(key_column.in_(chunk)).all())
+    return rows
+
+
+# ISO (YYYY-MM-DD) and US (MM/DD/YYYY) dates, the formats REDCap exports by default
+_DATE_RE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$|^(\d{1,2})/(\d{1,2})/(\d{4})$')
+
+# Less common REDCap date formats, tried with strptime when the regex doesn't match
+_FALLBACK_DATE_FORMATS = ('%d-%m-%Y', '%m-%d-%Y')
+
+_TRUTHY = frozenset(('1', 'yes', 'true'))
+
+# riskScore values as Firebase writes them, resolved without strip()/lower()
+_RISK_LABELS = {'Risky': True, 'risky': True, 'RISKY': True, 'Not Risky': False, 'not risky': False, '': False}
+
+
+def is_risky_score(risk_value):
+    """
+    Check if message is risky based on Firebase riskScore field.
+    Returns True if value is "Risky", False otherwise.
+    """
+    if not isinstance(risk_value, str):
+        return False
+    risky = _RISK_LABELS.get(risk_value)
+    if risky is None:
+        # Uncommon spelling or padding: normalize before comparing
+        risky = risk_value.strip().lower() == "risky"
+    return risky
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_str(date_str):
+    """Parse a stripped REDCap date string; cached since study dates repeat heavily"""
+    match = _DATE_RE.match(date_str)
+    if match:
+        iso_year, iso_month, iso_day, us_month, us_day, us_year = match.groups()
+        try:
+            if iso_year:
+                return date(int(iso_year), int(iso_month), int(iso_day))
+            return date(int(us_year), int(us_month), int(us_day))
+        except ValueError:
+            return None
+
+    for fmt in _FALLBACK_DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _new_user_row(firebase_id, synced_at, **values):
+    """Column values for a new user staged for bulk insert"""
+    row = dict(firebase_id=firebase_id, is_active=True, last_synced=synced_at, redcap_content_hash=None)
+    row.update(values)
+    return row
+
+
+def _content_hash(project_id, participant):
+    """Digest of a REDCap record, used to skip participants unchanged since they were last written"""
+    payload = json.dumps([project_id, participant], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _assign(user, **values):
+    """
+    Set fields on a User, or on a staged user row (dict) awaiting bulk insert.
+    Unchanged User attributes are left alone so stable rows never enter session.dirty.
+    """
+    if isinstance(user, dict):
+        user.update(values)
+    else:
+        for name, value in values.items():
+            if getattr(user, name) != value:
+                setattr(user, name, value)
+
+
+def _field(user, name):
+    """Read a field from a User or a staged user row"""
+    if isinstance(user, dict):
+        return user.get(name)
+    return getattr(user, name)
 
 
 class SyncService:
@@ -54,58 +190,93 @@ class SyncService:
 
     def __init__(self):
         self.timezone = pytz.timezone(Config.TIMEZONE)
+        # (last sync timestamp, time.monotonic() when cached), or None
+        self._last_sync_cache = None
 
-    def _fetch_and_update_auth_identifier(self, user):
+    def _fetch_auth_identifier(self, firebase_id):
         """
-        Fetch authentication data from Firebase Auth and update user's identifier.
-        The identifier is typically the email address from Firebase Authentication.
-        If Firebase Auth doesn't provide an identifier, preserve the existing one (e.g., username from REDCap).
+        Fetch a user's identifier from Firebase Authentication.
+        The identifier is typically the email address, falling back to phone number or display name.
+        Returns None if Firebase Auth provides nothing, so callers keep the existing identifier
+        (e.g., username from REDCap) rather than overwriting it with '-'.
         """
         try:
-            auth_data = firebase_service.get_auth_user(user.firebase_id)
+            auth_data = firebase_service.get_auth_user(firebase_id)
             if auth_data:
                 # Use email as the identifier, fall back to phone number or display name
-                auth_identifier = auth_data.get('email') or auth_data.get('phone_number') or auth_data.get('display_name')
-                if auth_identifier:
-                    user.identifier = auth_identifier
-                    print(f"Updated identifier for {user.firebase_id}: {user.identifier}")
-                # If no auth identifier, keep existing identifier (e.g., username from REDCap)
-            # If no auth_data, keep existing identifier (don't overwrite with '-')
+                return auth_data.get('email') or auth_data.get('phone_number') or auth_data.get('display_name')
         except Exception as e:
-            print(f"Error fetching auth identifier for {user.firebase_id}: {e}")
-            # Keep existing identifier on error (don't overwrite with '-')
+            logger.warning("Error fetching auth identifier for %s: %s", firebase_id, e)
+        return None
 
-    def _is_risky(self, risk_value):
+    def _batch_fetch_auth_identifiers(self, firebase_ids):
         """
-        Check if message is risky based on Firebase riskScore field.
-        Returns True if value is "Risky", False otherwise.
+        Fetch Firebase Auth identifiers for many users concurrently.
+        Returns {firebase_id: identifier}, omitting users Firebase Auth has no identifier for.
+        Placeholder (redcap_*) IDs are skipped since they never exist in Firebase Auth.
         """
-        if risk_value is None:
-            return False
-        if isinstance(risk_value, str):
-            return risk_value.strip().lower() == "risky"
-        return False
+        firebase_ids = [
+            firebase_id for firebase_id in dict.fromkeys(firebase_ids)
+            if firebase_id and not firebase_id.startswith('redcap_')
+        ]
+        if not firebase_ids:
+            return {}
+
+        # Initialize the Firebase app up front so worker threads don't race to do it
+        firebase_service.initialize()
+        with ThreadPoolExecutor(max_workers=AUTH_LOOKUP_WORKERS) as executor:
+            identifiers = executor.map(self._fetch_auth_identifier, firebase_ids)
+            return {
+                firebase_id: identifier
+                for firebase_id, identifier in zip(firebase_ids, identifiers)
+                if identifier
+            }
+
+    def _apply_auth_identifier(self, user, auth_identifiers):
+        """
+        Update user's identifier from prefetched Firebase Auth identifiers.
+        If Firebase Auth doesn't provide an identifier, preserve the existing one (e.g., username from REDCap).
+        """
+        auth_identifier = auth_identifiers.get(user.firebase_id)
+        if auth_identifier:
+            user.identifier = auth_identifier
+            logger.debug("Updated identifier for %s: %s", user.firebase_id, user.identifier)
+
+    def _load_users_by_firebase_id(self, firebase_ids):
+        """
+        Fetch the existing users for a set of Firebase IDs with chunked IN queries.
+        Returns a dict of firebase_id -> User so sync loops can look users up
+        without issuing a SELECT per row.
+        """
+        user_map = {}
+        for chunk in _chunked({fid for fid in firebase_ids if fid}):
+            for user in User.query.filter(User.firebase_id.in_(chunk)).all():
+                user_map[user.firebase_id] = user
+        return user_map
 
     def get_last_sync_timestamp(self):
         """Get the timestamp of the last successful sync"""
-        last_sync = SyncLog.query.order_by(SyncLog.last_sync_timestamp.desc()).first()
-        if last_sync:
-            return last_sync.last_sync_timestamp
-        return None
+        if self._last_sync_cache is not None:
+            timestamp, cached_at = self._last_sync_cache
+            if time.monotonic() - cached_at < LAST_SYNC_CACHE_TTL:
+                return timestamp
+
+        # MAX() over the indexed column is a single index lookup, no row fetch
+        timestamp = db.session.query(func.max(SyncLog.last_sync_timestamp)).scalar()
+        self._last_sync_cache = (timestamp, time.monotonic())
+        return timestamp
 
     def _parse_date(self, date_str):
         """Parse date string from REDCap into a date object"""
-        if not date_str or not date_str.strip():
+        if not date_str:
+            return None
+        date_str = date_str.strip()
+        if not date_str:
             return None
         try:
-            # Try common REDCap date formats
-            for fmt in ['%Y-%m-%d', '%m/%d/%Y', '%d-%m-%Y', '%m-%d-%Y']:
-                try:
-                    return datetime.strptime(date_str.strip(), fmt).date()
-                except ValueError:
-                    continue
+            return _parse_date_str(date_str)
         except Exception as e:
-            print(f"Error parsing date '{date_str}': {e}")
+            logger.warning("Error parsing date '%s': %s", date_str, e)
         return None
 
     def _parse_boolean(self, value):
@@ -117,7 +288,7 @@ class SyncService:
         if isinstance(value, int):
             return value == 1
         if isinstance(value, str):
-            return value.strip().lower() in ('1', 'yes', 'true')
+            return value in _TRUTHY or value.strip().lower() in _TRUTHY
         return False
 
     def _sync_project_to_db(self, project_config):
@@ -131,60 +302,94 @@ class SyncService:
                 is_active=True
             )
             db.session.add(project)
-            db.session.commit()
-            print(f"Created REDCap project record: {project_config.id}")
+            db.session.flush()
+            logger.info("Created REDCap project record: %s", project_config.id)
         return project
 
-    def _sync_user_custom_fields(self, user, participant_data, project_config):
-        """Sync custom REDCap fields for a user"""
-        for custom_field_config in project_config.custom_display_fields:
-            field_name = custom_field_config.get('field')
-            field_label = custom_field_config.get('label', field_name)
+    def _custom_field_specs(self, project_config):
+        """(field_name, field_label) pairs for a project's configured custom fields"""
+        return tuple(
+            (field_config.get('field'), field_config.get('label', field_config.get('field')))
+            for field_config in project_config.custom_display_fields
+            if field_config.get('field')
+        )
+
+    def _custom_field_rows(self, user_id, participant_data, custom_field_specs, now):
+        """Custom REDCap field values for a user, as rows for _flush_custom_fields"""
+        rows = []
+        for field_name, field_label in custom_field_specs:
             field_value = participant_data.get(field_name, '')
+            rows.append(dict(
+                user_id=user_id,
+                field_name=field_name,
+                field_label=field_label,
+                field_value=str(field_value) if field_value else '',
+                last_updated=now
+            ))
+        return rows
+
+    def _flush_custom_fields(self, rows):
+        """
+        Upsert custom field rows in one statement, keyed on (user_id, field_name).
+        Falls back to per-row find-or-create on databases without ON CONFLICT support.
+        """
+        # A single upsert can't touch the same row twice, so the last value per field wins
+        rows = list({(row['user_id'], row['field_name']): row for row in rows}.values())
+        if not rows:
+            return
+
+        insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+        if insert is None:
+            for row in rows:
+                custom_field = UserCustomField.query.filter_by(
+                    user_id=row['user_id'],
+                    field_name=row['field_name']
+                ).first()
+                if not custom_field:
+                    db.session.add(UserCustomField(**row))
+                else:
+                    custom_field.field_value = row['field_value']
+                    custom_field.field_label = row['field_label']
+                    custom_field.last_updated = row['last_updated']
+            return
+
+        stmt = insert(UserCustomField)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'field_name'],
+            set_={
+                'field_label': stmt.excluded.field_label,
+                'field_value': stmt.excluded.field_value,
+                'last_updated': stmt.excluded.last_updated
+            }
+        )
+        db.session.execute(stmt, rows)
 
-            if not field_name:
-                continue
-
-            # Find or create custom field record
-            custom_field = UserCustomField.query.filter_by(
-                user_id=user.id,
-                field_name=field_name
-            ).first()
-
-            if not custom_field:
-                custom_field = UserCustomField(
-                    user_id=user.id,
-                    field_name=field_name,
-                    field_label=field_label,
-                    field_value=str(field_value) if field_value else ''
-                )
-                db.session.add(custom_field)
-            else:
-                custom_field.field_value = str(field_value) if field_value else ''
-                custom_field.field_label = field_label
-                custom_field.last_updated = datetime.utcnow()
-
-    def sync_uid_users(self):
+    def sync_uid_users(self, activated_ids=None):
         """
         Sync users specified by Firebase UIDs directly (not from REDCap).
         This is useful for external testers who are not in REDCap.
+        Firebase IDs of users left active are added to activated_ids once committed.
         """
         synced_count = 0
+        now = datetime.utcnow()  # one timestamp for the whole pass
+        activated = set()
+        user_map = self._load_users_by_firebase_id(Config.FIREBASE_UIDS)
+        auth_identifiers = self._batch_fetch_auth_identifiers(Config.FIREBASE_UIDS)
 
         for firebase_id in Config.FIREBASE_UIDS:
             if not firebase_id:
                 continue
 
-            print(f"Processing UID-specified user: firebase_id={firebase_id}")
+            logger.debug("Processing UID-specified user: firebase_id=%s", firebase_id)
 
             try:
                 # Check if this Firebase user exists
                 firebase_user = firebase_service.get_user_by_id(firebase_id)
 
                 if not firebase_user:
-                    print(f"Warning: Firebase ID '{firebase_id}' not found in Firebase users collection")
+                    logger.warning("Firebase ID '%s' not found in Firebase users collection", firebase_id)
                     # Still create a placeholder in case they're added later
-                    user = User.query.filter_by(firebase_id=firebase_id).first()
+                    user = user_map.get(firebase_id)
                     if not user:
                         user = User(
                             firebase_id=firebase_id,
@@ -193,15 +398,17 @@ class SyncService:
                             is_active=True
                         )
                         db.session.add(user)
-                        print(f"Created placeholder for UID user {firebase_id}")
+                        user_map[firebase_id] = user
+                        logger.debug("Created placeholder for UID user %s", firebase_id)
                     else:
                         user.is_active = True
                         user.research_assistant = 'External Tester'
+                    activated.add(firebase_id)
                     synced_count += 1
                     continue
 
                 # Firebase user exists - create or update local user
-                user = User.query.filter_by(firebase_id=firebase_id).first()
+                user = user_map.get(firebase_id)
 
                 if not user:
                     user = User(
@@ -210,25 +417,27 @@ class SyncService:
                         research_assistant='External Tester'
                     )
                     db.session.add(user)
-                    print(f"Created new UID user with Firebase ID {firebase_id}")
+                    user_map[firebase_id] = user
+                    logger.debug("Created new UID user with Firebase ID %s", firebase_id)
                 else:
                     # Don't overwrite REDCap data if it exists
                     if not user.redcap_id:
                         user.research_assistant = 'External Tester'
-                    print(f"Updated existing UID user with Firebase ID {firebase_id}")
+                    logger.debug("Updated existing UID user with Firebase ID %s", firebase_id)
 
                 user.is_active = True
-                user.last_synced = datetime.utcnow()
+                user.last_synced = now
+                activated.add(firebase_id)
 
-                # Fetch and update identifier from Firebase Authentication
-                self._fetch_and_update_auth_identifier(user)
+                # Update identifier from Firebase Authentication
+                self._apply_auth_identifier(user, auth_identifiers)
 
                 synced_count += 1
 
             except Exception as e:
-                print(f"Error syncing UID user {firebase_id}: {e}")
+                logger.warning("Error syncing UID user %s: %s", firebase_id, e)
                 # Create placeholder user on error
-                user = User.query.filter_by(firebase_id=firebase_id).first()
+                user = user_map.get(firebase_id)
                 if not user:
                     user = User(
                         firebase_id=firebase_id,
@@ -237,32 +446,40 @@ class SyncService:
                         is_active=True
                     )
                     db.session.add(user)
+                    user_map[firebase_id] = user
+                    activated.add(firebase_id)
                 synced_count += 1
 
         db.session.commit()
-        print(f"Synced {synced_count} UID-specified users")
+        if activated_ids is not None:
+            activated_ids.update(activated)
+        logger.info("Synced %s UID-specified users", synced_count)
         return synced_count
 
-    def sync_all_firebase_users(self):
+    def sync_all_firebase_users(self, activated_ids=None):
         """
         Sync all users from Firebase without any filtering.
         This pulls every user from the Firebase users collection.
+        Firebase IDs of users left active are added to activated_ids once committed.
         """
         synced_count = 0
+        now = datetime.utcnow()  # one timestamp for the whole pass
 
         try:
-            firebase_users = firebase_service.get_users()
-            print(f"Found {len(firebase_users)} users in Firebase")
+            firebase_users = firebase_service.get_users_list(fields=FIREBASE_USER_FIELDS)
+            logger.info("Found %s users in Firebase", len(firebase_users))
+            user_map = self._load_users_by_firebase_id(u.get('firebase_id') for u in firebase_users)
+            auth_identifiers = self._batch_fetch_auth_identifiers(u.get('firebase_id') for u in firebase_users)
 
             for fb_user in firebase_users:
                 firebase_id = fb_user.get('firebase_id')
 
                 if not firebase_id:
-                    print(f"Warning: Firebase user without ID found, skipping")
+                    logger.warning("Firebase user without ID found, skipping")
                     continue
 
                 # Check if user exists in local database
-                user = User.query.filter_by(firebase_id=firebase_id).first()
+                user = user_map.get(firebase_id)
 
                 if not user:
                     # Create new user
@@ -273,256 +490,309 @@ class SyncService:
                         is_active=True
                     )
                     db.session.add(user)
-                    print(f"Created new user with Firebase ID {firebase_id}")
+                    user_map[firebase_id] = user
+                    logger.debug("Created new user with Firebase ID %s", firebase_id)
                 else:
                     # Update existing user
                     # Don't overwrite REDCap data if it exists
                     if not user.redcap_id:
                         user.research_assistant = 'Firebase User'
                     user.is_active = True
-                    print(f"Updated existing user with Firebase ID {firebase_id}")
+                    logger.debug("Updated existing user with Firebase ID %s", firebase_id)
 
                 # Update Firebase-specific fields
-                user.current_convo_id = fb_user.get('convoID', '')
-                user.is_animated = fb_user.get('isAnimate', False)
-                user.is_dark_mode = fb_user.get('isDark', False)
-                user.last_synced = datetime.utcnow()
+                _assign(
+                    user,
+                    current_convo_id=fb_user.get('convoID', ''),
+                    is_animated=fb_user.get('isAnimate', False),
+                    is_dark_mode=fb_user.get('isDark', False)
+                )
+                user.last_synced = now
 
-                # Fetch and update identifier from Firebase Authentication
-                self._fetch_and_update_auth_identifier(user)
+                # Update identifier from Firebase Authentication
+                self._apply_auth_identifier(user, auth_identifiers)
 
                 synced_count += 1
 
             db.session.commit()
-            print(f"Synced {synced_count} Firebase users")
+            if activated_ids is not None:
+                activated_ids.update(user_map)
+            logger.info("Synced %s Firebase users", synced_count)
             return synced_count
 
         except Exception as e:
-            print(f"Error syncing all Firebase users: {e}")
+            logger.error("Error syncing all Firebase users: %s", e)
             db.session.rollback()
             return 0
 
-    def sync_redcap_participants(self):
+    def _sync_project_participants(self, project_config, redcap_participants, now, activated):
         """
-        Sync participants from ALL REDCap projects to local database.
-        Iterates through each configured project and syncs participants with
-        project_id, study dates, and custom fields.
-
-        The firebase_id from REDCap should match the Firebase document ID in the users collection.
+        Write one project's REDCap participants to the local database.
+        Runs inside the caller's transaction and does not commit; returns the synced count.
+        now is the sync pass timestamp stamped on every row written.
+        Firebase IDs of users left active are added to the activated set.
         """
-        total_synced = 0
+        # Per-project settings, read once rather than per participant
+        project_id = project_config.id
+        firebase_id_field = project_config.firebase_id_field
+        ra_field = project_config.ra_field
+        start_date_field = project_config.study_start_date_field
+        end_date_field = project_config.study_end_date_field
+        custom_field_specs = self._custom_field_specs(project_config)
+        synced_count = 0
+        unchanged_count = 0
+
+        # Extract the identity columns once; they drive the user prefetch and the skip check
+        record_ids = [p.get('record_id') or p.get('id') for p in redcap_participants]
+        firebase_ids = [p.get(firebase_id_field, '').strip() for p in redcap_participants]
+        placeholder_ids = [f'redcap_{project_id}_{record_id}' for record_id in record_ids]
+
+        # Load every user this project can touch (real and placeholder IDs) in one pass
+        user_map = self._load_users_by_firebase_id(set(firebase_ids).union(placeholder_ids))
+
+        # user_map values are Users, or dicts for users staged for bulk insert
+        custom_field_targets = []  # (user, participant) pairs synced once ids exist
+        auth_targets = []  # users whose identifier is refreshed from Firebase Auth after the loop
+
+        # placeholder_firebase_id: project-specific ID for participants without a usable Firebase user
+        for participant, record_id, firebase_id, placeholder_firebase_id in zip(
+            redcap_participants, record_ids, firebase_ids, placeholder_ids
+        ):
+            # Skip records unchanged since they were last written. Only the user the record
+            # resolves to is trusted: a placeholder for a participant with a Firebase ID may
+            # need promoting once that ID shows up in Firebase.
+            content_hash = _content_hash(project_id, participant)
+            existing_user = user_map.get(firebase_id or placeholder_firebase_id)
+            if isinstance(existing_user, User) and existing_user.redcap_content_hash == content_hash:
+                _assign(existing_user, is_active=True)
+                activated.add(existing_user.firebase_id)
+                unchanged_count += 1
+                synced_count += 1
+                continue
 
-        # Get all configured projects
-        projects = Config.get_all_projects()
-        print(f"Syncing participants from {len(projects)} REDCap project(s)")
+            research_assistant = participant.get(ra_field, '').strip()
+            username = participant.get('username', '').strip()  # Get username from REDCap
 
-        for project_config in projects:
-            print(f"\n--- Syncing project: {project_config.name} ({project_config.id}) ---")
+            # Parse study dates
+            study_start = self._parse_date(participant.get(start_date_field, '')) if start_date_field else None
+            study_end = self._parse_date(participant.get(end_date_field, '')) if end_date_field else None
 
-            # Ensure project exists in database
-            self._sync_project_to_db(project_config)
+            # Parse dropped status fields
+            dropped = self._parse_boolean(participant.get('dropped', ''))
+            dropped_surveys = self._parse_boolean(participant.get('dropped_surveys', ''))
 
-            # Create service for this specific project
-            project_service = REDCapService(project_config)
+            logger.debug("Processing participant: record_id=%s, firebase_id=%s, RA=%s",
+                         record_id, firebase_id, research_assistant)
 
-            try:
-                redcap_participants = project_service.get_all_participants()
-            except Exception as e:
-                print(f"Error fetching participants from {project_config.name}: {e}")
-                continue
+            # REDCap-sourced fields written on both create and update
+            redcap_fields = dict(
+                research_assistant=research_assistant,
+                project_id=project_id,
+                study_start_date=study_start,
+                study_end_date=study_end,
+                dropped=dropped,
+                dropped_surveys=dropped_surveys
+            )
 
-            firebase_id_field = project_config.firebase_id_field
-            ra_field = project_config.ra_field
-            synced_count = 0
+            if not firebase_id or firebase_id == '':
+                # No Firebase ID - create placeholder user with REDCap ID only
+                if not record_id:
+                    logger.debug("Skipping participant with no record_id and no firebase_id")
+                    continue
 
-            for participant in redcap_participants:
-                record_id = participant.get('record_id') or participant.get('id')
-                firebase_id = participant.get(firebase_id_field, '').strip()
-                research_assistant = participant.get(ra_field, '').strip()
-                username = participant.get('username', '').strip()  # Get username from REDCap
+                user = user_map.get(placeholder_firebase_id)
+                if user is None:
+                    user = user_map[placeholder_firebase_id] = _new_user_row(
+                        placeholder_firebase_id, now,
+                        redcap_firebase_id='',  # No firebase_id in REDCap
+                        redcap_id=str(record_id),
+                        identifier=username or '-',  # Use username from REDCap
+                        **redcap_fields
+                    )
+                    logger.debug("Created placeholder user for REDCap ID %s", record_id)
+                else:
+                    _assign(
+                        user,
+                        redcap_firebase_id='',
+                        identifier=username or _field(user, 'identifier') or '-',  # Use username from REDCap
+                        is_active=True,
+                        **redcap_fields
+                    )
+                    logger.debug("Updated placeholder user for REDCap ID %s", record_id)
 
-                # Parse study dates
-                study_start = self._parse_date(
-                    participant.get(project_config.study_start_date_field, '')
-                ) if project_config.study_start_date_field else None
+                _assign(user, redcap_content_hash=content_hash)
+                activated.add(placeholder_firebase_id)
+                custom_field_targets.append((user, participant))
+                synced_count += 1
+            else:
+                # Has Firebase ID - verify it exists in Firebase and create/update user
+                try:
+                    firebase_user = firebase_service.get_user_by_id(firebase_id)
+
+                    if not firebase_user:
+                        logger.warning("Firebase ID '%s' from REDCap record %s not found in Firebase",
+                                       firebase_id, record_id)
+                        user = user_map.get(placeholder_firebase_id)
+                        if user is None:
+                            user = user_map[placeholder_firebase_id] = _new_user_row(
+                                placeholder_firebase_id, now,
+                                redcap_firebase_id=firebase_id,  # Store actual firebase_id from REDCap
+                                redcap_id=str(record_id),
+                                identifier=username or '-',  # Use username from REDCap
+                                **redcap_fields
+                            )
+                        else:
+                            _assign(
+                                user,
+                                redcap_firebase_id=firebase_id,  # Store actual firebase_id from REDCap
+                                identifier=username or _field(user, 'identifier') or '-',  # Use username from REDCap
+                                is_active=True,
+                                **redcap_fields
+                            )
 
-                study_end = self._parse_date(
-                    participant.get(project_config.study_end_date_field, '')
-                ) if project_config.study_end_date_field else None
+                        _assign(user, redcap_content_hash=content_hash)
+                        activated.add(placeholder_firebase_id)
+                        custom_field_targets.append((user, participant))
+                        synced_count += 1
+                        continue
 
-                # Parse dropped status fields
-                dropped = self._parse_boolean(participant.get('dropped', ''))
-                dropped_surveys = self._parse_boolean(participant.get('dropped_surveys', ''))
+                    # Firebase user exists - create or update local user
+                    user = user_map.get(firebase_id)
+
+                    if user is None:
+                        # Check for placeholder user
+                        placeholder_user = user_map.pop(placeholder_firebase_id, None)
+                        if placeholder_user is not None:
+                            user = user_map[firebase_id] = placeholder_user
+                            _assign(
+                                user,
+                                firebase_id=firebase_id,
+                                redcap_firebase_id=firebase_id  # Store actual firebase_id from REDCap
+                            )
+                            logger.debug("Updated placeholder with actual Firebase ID %s", firebase_id)
+                        else:
+                            user = user_map[firebase_id] = _new_user_row(
+                                firebase_id, now,
+                                redcap_firebase_id=firebase_id,  # Store actual firebase_id from REDCap
+                                redcap_id=str(record_id) if record_id else None,
+                                identifier=username or '-',  # Use username from REDCap as default
+                                **redcap_fields
+                            )
+                            logger.debug("Created new user with Firebase ID %s", firebase_id)
+                    else:
+                        _assign(
+                            user,
+                            redcap_firebase_id=firebase_id,  # Store actual firebase_id from REDCap
+                            redcap_id=str(record_id) if record_id else _field(user, 'redcap_id'),
+                            **redcap_fields
+                        )
+                        # Use username from REDCap if no identifier exists yet
+                        if not _field(user, 'identifier') or _field(user, 'identifier') == '-':
+                            _assign(user, identifier=username or '-')
+                        logger.debug("Updated existing user with Firebase ID %s", firebase_id)
 
-                print(f"Processing participant: record_id={record_id}, firebase_id={firebase_id}, RA={research_assistant}")
+                    _assign(user, is_active=True, last_synced=now, redcap_content_hash=content_hash)
+                    activated.add(firebase_id)
 
-                if not firebase_id or firebase_id == '':
-                    # No Firebase ID - create placeholder user with REDCap ID only
-                    if not record_id:
-                        print(f"Skipping participant with no record_id and no firebase_id")
-                        continue
+                    # Identifier from Firebase Auth (will override username if user has Firebase Auth)
+                    auth_targets.append(user)
 
-                    # Use project-specific placeholder ID
-                    placeholder_firebase_id = f'redcap_{project_config.id}_{record_id}'
-                    user = User.query.filter_by(firebase_id=placeholder_firebase_id).first()
-                    if not user:
-                        user = User(
-                            firebase_id=placeholder_firebase_id,
-                            redcap_firebase_id='',  # No firebase_id in REDCap
+                    custom_field_targets.append((user, participant))
+                    synced_count += 1
+
+                except Exception as e:
+                    logger.warning("Error checking Firebase user %s: %s", firebase_id, e)
+                    user = user_map.get(placeholder_firebase_id)
+                    if user is None:
+                        user = user_map[placeholder_firebase_id] = _new_user_row(
+                            placeholder_firebase_id, now,
+                            redcap_firebase_id=firebase_id,  # Store actual firebase_id from REDCap
                             redcap_id=str(record_id),
                             identifier=username or '-',  # Use username from REDCap
-                            research_assistant=research_assistant,
-                            project_id=project_config.id,
-                            study_start_date=study_start,
-                            study_end_date=study_end,
-                            dropped=dropped,
-                            dropped_surveys=dropped_surveys,
-                            is_active=True
+                            **redcap_fields
                         )
-                        db.session.add(user)
-                        print(f"Created placeholder user for REDCap ID {record_id}")
+                        activated.add(placeholder_firebase_id)
                     else:
-                        user.redcap_firebase_id = ''
-                        user.identifier = username or user.identifier or '-'  # Use username from REDCap
-                        user.research_assistant = research_assistant
-                        user.project_id = project_config.id
-                        user.study_start_date = study_start
-                        user.study_end_date = study_end
-                        user.dropped = dropped
-                        user.dropped_surveys = dropped_surveys
-                        user.is_active = True
-                        print(f"Updated placeholder user for REDCap ID {record_id}")
-
-                    # Sync custom fields
-                    db.session.flush()  # Ensure user.id is set
-                    self._sync_user_custom_fields(user, participant, project_config)
+                        _assign(
+                            user,
+                            redcap_firebase_id=firebase_id,
+                            identifier=username or _field(user, 'identifier') or '-',
+                            dropped=dropped,
+                            dropped_surveys=dropped_surveys
+                        )
+                    custom_field_targets.append((user, participant))
                     synced_count += 1
-                else:
-                    # Has Firebase ID - verify it exists in Firebase and create/update user
-                    try:
-                        firebase_user = firebase_service.get_user_by_id(firebase_id)
-
-                        if not firebase_user:
-                            print(f"Warning: Firebase ID '{firebase_id}' from REDCap record {record_id} not found in Firebase")
-                            placeholder_firebase_id = f'redcap_{project_config.id}_{record_id}'
-                            user = User.query.filter_by(firebase_id=placeholder_firebase_id).first()
-                            if not user:
-                                user = User(
-                                    firebase_id=placeholder_firebase_id,
-                                    redcap_firebase_id=firebase_id,  # Store actual firebase_id from REDCap
-                                    redcap_id=str(record_id),
-                                    identifier=username or '-',  # Use username from REDCap
-                                    research_assistant=research_assistant,
-                                    project_id=project_config.id,
-                                    study_start_date=study_start,
-                                    study_end_date=study_end,
-                                    dropped=dropped,
-                                    dropped_surveys=dropped_surveys,
-                                    is_active=True
-                                )
-                                db.session.add(user)
-                            else:
-                                user.redcap_firebase_id = firebase_id  # Store actual firebase_id from REDCap
-                                user.identifier = username or user.identifier or '-'  # Use username from REDCap
-                                user.research_assistant = research_assistant
-                                user.project_id = project_config.id
-                                user.study_start_date = study_start
-                                user.study_end_date = study_end
-                                user.dropped = dropped
-                                user.dropped_surveys = dropped_surveys
-                                user.is_active = True
-
-                            db.session.flush()
-                            self._sync_user_custom_fields(user, participant, project_config)
-                            synced_count += 1
-                            continue
-
-                        # Firebase user exists - create or update local user
-                        user = User.query.filter_by(firebase_id=firebase_id).first()
-
-                        if not user:
-                            # Check for placeholder user
-                            placeholder_firebase_id = f'redcap_{project_config.id}_{record_id}'
-                            placeholder_user = User.query.filter_by(firebase_id=placeholder_firebase_id).first()
-                            if placeholder_user:
-                                user = placeholder_user
-                                user.firebase_id = firebase_id
-                                user.redcap_firebase_id = firebase_id  # Store actual firebase_id from REDCap
-                                print(f"Updated placeholder with actual Firebase ID {firebase_id}")
-                            else:
-                                user = User(
-                                    firebase_id=firebase_id,
-                                    redcap_firebase_id=firebase_id,  # Store actual firebase_id from REDCap
-                                    redcap_id=str(record_id) if record_id else None,
-                                    identifier=username or '-',  # Use username from REDCap as default
-                                    research_assistant=research_assistant,
-                                    project_id=project_config.id,
-                                    study_start_date=study_start,
-                                    study_end_date=study_end,
-                                    dropped=dropped,
-                                    dropped_surveys=dropped_surveys
-                                )
-                                db.session.add(user)
-                                print(f"Created new user with Firebase ID {firebase_id}")
-                        else:
-                            user.redcap_firebase_id = firebase_id  # Store actual firebase_id from REDCap
-                            user.redcap_id = str(record_id) if record_id else user.redcap_id
-                            # Use username from REDCap if no identifier exists yet
-                            if not user.identifier or user.identifier == '-':
-                                user.identifier = username or '-'
-                            user.research_assistant = research_assistant
-                            user.project_id = project_config.id
-                            user.study_start_date = study_start
-                            user.study_end_date = study_end
-                            user.dropped = dropped
-                            user.dropped_surveys = dropped_surveys
-                            print(f"Updated existing user with Firebase ID {firebase_id}")
 
-                        user.is_active = True
-                        user.last_synced = datetime.utcnow()
+        if unchanged_count:
+            logger.info("Skipped %s unchanged participants", unchanged_count)
+
+        # Fetch Firebase Auth identifiers for all verified users at once
+        auth_identifiers = self._batch_fetch_auth_identifiers(_field(user, 'firebase_id') for user in auth_targets)
+        for user in auth_targets:
+            auth_identifier = auth_identifiers.get(_field(user, 'firebase_id'))
+            if auth_identifier:
+                _assign(user, identifier=auth_identifier)
+
+        # Insert all new users in one batch, then load their ids for the custom fields
+        new_user_rows = [row for row in user_map.values() if isinstance(row, dict)]
+        if new_user_rows:
+            db.session.bulk_insert_mappings(User, new_user_rows)
+            user_map.update(self._load_users_by_firebase_id(row['firebase_id'] for row in new_user_rows))
+
+        custom_field_rows = []
+        for user, participant in custom_field_targets:
+            if isinstance(user, dict):
+                user = user_map[user['firebase_id']]
+            custom_field_rows.extend(self._custom_field_rows(user.id, participant, custom_field_specs, now))
+        self._flush_custom_fields(custom_field_rows)
 
-                        # Fetch identifier from Firebase Auth (will override username if user has Firebase Auth)
-                        if not user.firebase_id.startswith('redcap_'):
-                            self._fetch_and_update_auth_identifier(user)
+        return synced_count
 
-                        # Sync custom fields
-                        db.session.flush()
-                        self._sync_user_custom_fields(user, participant, project_config)
-                        synced_count += 1
+    def sync_redcap_participants(self, activated_ids=None):
+        """
+        Sync participants from ALL REDCap projects to local database.
+        Iterates through each configured project and syncs participants with
+        project_id, study dates, and custom fields.
+        Firebase IDs of users left active are added to activated_ids as each project commits.
 
-                    except Exception as e:
-                        print(f"Error checking Firebase user {firebase_id}: {e}")
-                        placeholder_firebase_id = f'redcap_{project_config.id}_{record_id}'
-                        user = User.query.filter_by(firebase_id=placeholder_firebase_id).first()
-                        if not user:
-                            user = User(
-                                firebase_id=placeholder_firebase_id,
-                                redcap_firebase_id=firebase_id,  # Store actual firebase_id from REDCap
-                                redcap_id=str(record_id),
-                                identifier=username or '-',  # Use username from REDCap
-                                research_assistant=research_assistant,
-                                project_id=project_config.id,
-                                study_start_date=study_start,
-                                study_end_date=study_end,
-                                dropped=dropped,
-                                dropped_surveys=dropped_surveys,
-                                is_active=True
-                            )
-                            db.session.add(user)
-                        else:
-                            user.redcap_firebase_id = firebase_id
-                            user.identifier = username or user.identifier or '-'
-                            user.dropped = dropped
-                            user.dropped_surveys = dropped_surveys
-                        db.session.flush()
-                        self._sync_user_custom_fields(user, participant, project_config)
-                        synced_count += 1
+        The firebase_id from REDCap should match the Firebase document ID in the users collection.
+        """
+        total_synced = 0
+        now = datetime.utcnow()  # one timestamp for the whole pass
 
-            db.session.commit()
-            print(f"Synced {synced_count} participants from project {project_config.name}")
+        # Get all configured projects
+        projects = Config.get_all_projects()
+        logger.info("Syncing participants from %s REDCap project(s)", len(projects))
+
+        for project_config in projects:
+            logger.info("--- Syncing project: %s (%s) ---", project_config.name, project_config.id)
+
+            # Reuse the cached service for this project (falls back to a fresh one if unregistered)
+            project_service = redcap_service_manager.get_service(project_config.id) or REDCapService(project_config)
+
+            try:
+                redcap_participants = project_service.get_all_participants()
+            except Exception as e:
+                logger.warning("Error fetching participants from %s: %s", project_config.name, e)
+                continue
+
+            # One transaction per project: commit once, or roll back the whole pass
+            activated = set()
+            try:
+                self._sync_project_to_db(project_config)
+                synced_count = self._sync_project_participants(project_config, redcap_participants, now, activated)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error("Error syncing participants from %s, changes rolled back: %s", project_config.name, e)
+                continue
+
+            if activated_ids is not None:
+                activated_ids.update(activated)
+            logger.info("Synced %s participants from project %s", synced_count, project_config.name)
             total_synced += synced_count
 
-        print(f"\nTotal synced across all projects: {total_synced}")
+        logger.info("Total synced across all projects: %s", total_synced)
         return total_synced
 
     def sync_users(self, active_firebase_ids=None):
@@ -530,63 +800,85 @@ class SyncService:
         Sync users from Firebase to local database.
         If active_firebase_ids is provided, only sync those users.
         """
-        firebase_users = firebase_service.get_users()
+        firebase_users = [
+            fb_user for fb_user in firebase_service.get_users(fields=FIREBASE_USER_FIELDS)
+            # Filter by active participants if list is provided
+            if not active_firebase_ids or fb_user.get('firebase_id') in active_firebase_ids
+        ]
+        user_map = self._load_users_by_firebase_id(u.get('firebase_id') for u in firebase_users)
+        auth_identifiers = self._batch_fetch_auth_identifiers(u.get('firebase_id') for u in firebase_users)
         synced_count = 0
+        now = datetime.utcnow()  # one timestamp for the whole pass
 
         for fb_user in firebase_users:
             firebase_id = fb_user.get('firebase_id')
 
-            # Filter by active participants if list is provided
-            if active_firebase_ids and firebase_id not in active_firebase_ids:
-                continue
-
             # Check if user exists
-            user = User.query.filter_by(firebase_id=firebase_id).first()
+            user = user_map.get(firebase_id)
 
             if not user:
                 user = User(firebase_id=firebase_id)
                 db.session.add(user)
+                user_map[firebase_id] = user
 
             # Update user fields
-            user.current_convo_id = fb_user.get('convoID', '')
-            user.is_animated = fb_user.get('isAnimate', False)
-            user.is_dark_mode = fb_user.get('isDark', False)
+            _assign(
+                user,
+                current_convo_id=fb_user.get('convoID', ''),
+                is_animated=fb_user.get('isAnimate', False),
+                is_dark_mode=fb_user.get('isDark', False)
+            )
             user.is_active = active_firebase_ids is None or firebase_id in active_firebase_ids
-            user.last_synced = datetime.utcnow()
+            user.last_synced = now
 
-            # Fetch and update identifier from Firebase Authentication
-            self._fetch_and_update_auth_identifier(user)
+            # Update identifier from Firebase Authentication
+            self._apply_auth_identifier(user, auth_identifiers)
 
             synced_count += 1
 
         db.session.commit()
-        print(f"Synced {synced_count} users")
+        logger.info("Synced %s users", synced_count)
         return synced_count
 
-    def sync_conversations(self, since_timestamp=None):
-        """Sync conversations from Firebase"""
-        conversations = firebase_service.get_conversations_since(since_timestamp)
+    def sync_conversations(self, since_timestamp=None, conversations=None):
+        """
+        Sync conversations from Firebase.
+        conversations may be passed in when the caller already fetched them.
+        """
+        if conversations is None:
+            conversations = firebase_service.get_conversations_since_list(since_timestamp)
         synced_count = 0
 
+        # Load existing conversations and owning user ids once for the whole batch
+        convo_map = {}
+        for chunk in _chunked({c.get('firebase_convo_id') for c in conversations if c.get('firebase_convo_id')}):
+            for convo in Conversation.query.filter(Conversation.firebase_convo_id.in_(chunk)).all():
+                convo_map[convo.firebase_convo_id] = convo
+        user_ids = dict(_select_in_chunks(
+            [User.firebase_id, User.id], User.firebase_id,
+            (c.get('userID') for c in conversations)
+        ))
+
         for fb_convo in conversations:
             firebase_convo_id = fb_convo.get('firebase_convo_id')
             user_firebase_id = fb_convo.get('userID')
 
             # Check if conversation already exists
-            convo = Conversation.query.filter_by(firebase_convo_id=firebase_convo_id).first()
+            convo = convo_map.get(firebase_convo_id)
 
             if not convo:
                 # Find the user
-                user = User.query.filter_by(firebase_id=user_firebase_id).first()
-                if not user:
-                    print(f"Warning: User {user_firebase_id} not found for conversation {firebase_convo_id}")
+                user_id = user_ids.get(user_firebase_id)
+                if not user_id:
+                    logger.warning("User %s not found for conversation %s", user_firebase_id, firebase_convo_id)
                     continue
 
                 convo = Conversation(
                     firebase_convo_id=firebase_convo_id,
-                    user_id=user.id
+                    user_id=user_id
                 )
                 db.session.add(convo)
+                convo_map[firebase_convo_id] = convo
 
             # Update conversation fields
             convo.prompt = fb_convo.get('prompt', '')
@@ -595,93 +887,245 @@ class SyncService:
             synced_count += 1
 
         db.session.commit()
-        print(f"Synced {synced_count} conversations")
+        logger.info("Synced %s conversations", synced_count)
         return synced_count
 
-    def sync_messages(self, since_timestamp=None, uid_list=None):
+    def _insert_messages(self, rows):
+        """
+        Insert message rows with executemany batches.
+        Returns {firebase_message_id: id}, read back with RETURNING in the same round-trip
+        where the database supports it, or with one chunked id query otherwise.
+        """
+        table = Message.__table__
+        returning = db.session.get_bind().dialect.insert_executemany_returning
+        message_ids = {}
+
+        for batch in _chunked(rows, INSERT_BATCH_SIZE):
+            if returning:
+                result = db.session.execute(table.insert().returning(table.c.firebase_message_id, table.c.id), batch)
+                message_ids.update((firebase_message_id, message_id) for firebase_message_id, message_id in result)
+            else:
+                db.session.execute(table.insert(), batch)
+
+        if rows and not returning:
+            message_ids = dict(_select_in_chunks(
+                [Message.firebase_message_id, Message.id], Message.firebase_message_id,
+                (row['firebase_message_id'] for row in rows)
+            ))
+        return message_ids
+
+    def _mark_alerts_sent(self, message_ids):
+        """Set alert_sent on the given message ids with chunked bulk UPDATEs"""
+        table = Message.__table__
+        for chunk in _chunked(message_ids):
+            db.session.execute(table.update().where(table.c.id.in_(chunk)).values(alert_sent=True))
+
+    def _refresh_firebase_user_fields(self, firebase_users):
+        """
+        Copy Firebase app settings and Firebase Auth identifiers onto the matching local users.
+        Current values are read with chunked column-only SELECTs, and only rows that differ are
+        written, in one executemany UPDATE keyed by firebase_id. Returns the number updated.
+        """
+        settings = {
+            fb_user['firebase_id']: (
+                fb_user.get('convoID', ''), fb_user.get('isAnimate', False), fb_user.get('isDark', False)
+            )
+            for fb_user in firebase_users if fb_user.get('firebase_id')
+        }
+        current = {
+            firebase_id: values for firebase_id, *values in _select_in_chunks(
+                [User.firebase_id, User.current_convo_id, User.is_animated, User.is_dark_mode, User.identifier],
+                User.firebase_id, settings
+            )
+        }
+
+        # Fetch identifiers from Firebase Authentication; keep the existing one when it has none
+        auth_identifiers = self._batch_fetch_auth_identifiers(current)
+
+        updates = []
+        for firebase_id, (current_convo_id, is_animated, is_dark_mode, identifier) in current.items():
+            new_convo_id, new_is_animated, new_is_dark_mode = settings[firebase_id]
+            new_identifier = auth_identifiers.get(firebase_id) or identifier
+            if (new_convo_id, new_is_animated, new_is_dark_mode, new_identifier) != (
+                current_convo_id, is_animated, is_dark_mode, identifier
+            ):
+                updates.append({
+                    'b_firebase_id': firebase_id,
+                    'b_current_convo_id': new_convo_id,
+                    'b_is_animated': new_is_animated,
+                    'b_is_dark_mode': new_is_dark_mode,
+                    'b_identifier': new_identifier
+                })
+
+        if updates:
+            table = User.__table__
+            db.session.execute(
+                table.update()
+                .where(table.c.firebase_id == bindparam('b_firebase_id'))
+                .values(
+                    current_convo_id=bindparam('b_current_convo_id'),
+                    is_animated=bindparam('b_is_animated'),
+                    is_dark_mode=bindparam('b_is_dark_mode'),
+                    identifier=bindparam('b_identifier')
+                ),
+                updates
+            )
+        db.session.commit()
+        logger.debug("Updated Firebase fields for %s of %s users", len(updates), len(current))
+        return len(updates)
+
+    def _deactivate_users_except(self, active_firebase_ids):
+        """
+        Deactivate active users whose Firebase ID is not in active_firebase_ids.
+        Only rows that actually change are written; returns the number deactivated.
+        """
+        currently_active = {
+            firebase_id for (firebase_id,) in db.session.query(User.firebase_id).filter(User.is_active == True)
+        }
+        stale_ids = sorted(currently_active.difference(active_firebase_ids))
+        table = User.__table__
+        for chunk in _chunked(stale_ids):
+            db.session.execute(table.update().where(table.c.firebase_id.in_(chunk)).values(is_active=False))
+        db.session.commit()
+        return len(stale_ids)
+
+    def sync_messages(self, since_timestamp=None, uid_list=None, messages=None):
         """
         Sync messages from Firebase. This is the key method that only pulls new messages.
         Also handles risk score monitoring and alerts.
 
         Args:
             since_timestamp: Only fetch messages after this timestamp (unless uid_list is provided)
-            uid_list: If provided, fetch ALL messages for these UIDs regardless of timestamp
+            uid_list: If provided, fetch messages for these UIDs regardless of since_timestamp,
+                resuming each user from their own last_message_ts watermark
+            messages: Messages the caller already fetched for since_timestamp (ignored with uid_list)
         """
         synced_count = 0
         alerts_sent = 0
         all_messages = []
+        newest_by_uid = {}  # UID -> newest fetched message timestamp (next watermark)
+        incomplete_uids = set()  # UIDs with messages that couldn't be stored this pass
+        rows_to_insert = []  # new message rows, written with Core executemany inserts
+        risky_rows = []  # (row, user_firebase_id) pairs to alert on once the rows have ids
 
         if uid_list:
-            # For UID mode: fetch ALL messages for each UID user (ignore timestamp)
-            print(f"Fetching ALL messages for {len(uid_list)} UID users...")
-            for firebase_id in uid_list:
-                try:
-                    user_messages = firebase_service.get_messages_for_user(firebase_id)
-                    all_messages.extend(user_messages)
-                    print(f"Retrieved {len(user_messages)} messages for UID {firebase_id}")
-                except Exception as e:
-                    print(f"Error fetching messages for UID {firebase_id}: {e}")
+            # For UID mode: fetch each UID user's messages newer than their watermark
+            logger.info("Fetching messages for %s UID users...", len(uid_list))
+            since_by_uid = dict(_select_in_chunks(
+                [User.firebase_id, User.last_message_ts], User.firebase_id, uid_list
+            ))
+            # Initialize the Firebase client up front so worker threads don't race to do it
+            firebase_service.initialize()
+            with ThreadPoolExecutor(max_workers=MESSAGE_FETCH_WORKERS) as executor:
+                futures = {
+                    executor.submit(
+                        firebase_service.get_messages_for_user, firebase_id,
+                        since_timestamp=since_by_uid.get(firebase_id), fields=FIREBASE_MESSAGE_FIELDS
+                    ): firebase_id
+                    for firebase_id in uid_list
+                }
+                for future in as_completed(futures):
+                    firebase_id = futures[future]
+                    try:
+                        user_messages = future.result()
+                        all_messages.extend(user_messages)
+                        timestamps = [m['timestamp'] for m in user_messages if m.get('timestamp')]
+                        if timestamps:
+                            newest_by_uid[firebase_id] = max(timestamps)
+                        logger.debug("Retrieved %s messages for UID %s", len(user_messages), firebase_id)
+                    except Exception as e:
+                        logger.warning("Error fetching messages for UID %s: %s", firebase_id, e)
+        elif messages is not None:
+            all_messages = messages
         else:
             # Regular mode: fetch only new messages since last sync
-            all_messages = firebase_service.get_messages_since(since_timestamp)
+            all_messages = firebase_service.get_messages_since_list(since_timestamp, fields=FIREBASE_MESSAGE_FIELDS)
+
+        # Look up existing messages, conversations and users once for the whole batch
+        existing_message_ids = {
+            message_id for (message_id,) in _select_in_chunks(
+                [Message.firebase_message_id], Message.firebase_message_id,
+                (m.get('firebase_message_id') for m in all_messages)
+            )
+        }
+        conversation_ids = dict(_select_in_chunks(
+            [Conversation.firebase_convo_id, Conversation.id], Conversation.firebase_convo_id,
+            (m.get('convoID') for m in all_messages)
+        ))
+        user_ids = dict(_select_in_chunks(
+            [User.firebase_id, User.id], User.firebase_id,
+            (m.get('userID') for m in all_messages)
+        ))
 
         for fb_message in all_messages:
             firebase_message_id = fb_message.get('firebase_message_id')
             convo_id_str = fb_message.get('convoID')
             user_firebase_id = fb_message.get('userID')
 
-            # Check if message already exists
-            message = Message.query.filter_by(firebase_message_id=firebase_message_id).first()
-
-            if message:
-                # Message already synced, skip
+            if firebase_message_id in existing_message_ids:
+                # Message already synced (or already queued in this batch), skip
                 continue
 
             # Find the conversation
-            conversation = Conversation.query.filter_by(firebase_convo_id=convo_id_str).first()
-            if not conversation:
-                print(f"Warning: Conversation {convo_id_str} not found for message {firebase_message_id}")
+            conversation_id = conversation_ids.get(convo_id_str)
+            if not conversation_id:
+                logger.warning("Conversation %s not found for message %s", convo_id_str, firebase_message_id)
+                incomplete_uids.add(user_firebase_id)
                 continue
 
             # Find the user
-            user = User.query.filter_by(firebase_id=user_firebase_id).first()
-            if not user:
-                print(f"Warning: User {user_firebase_id} not found for message {firebase_message_id}")
+            user_id = user_ids.get(user_firebase_id)
+            if not user_id:
+                logger.warning("User %s not found for message %s", user_firebase_id, firebase_message_id)
+                incomplete_uids.add(user_firebase_id)
                 continue
 
             # Check if message is risky (binary "Risky" / "Not Risky")
-            is_risky = self._is_risky(fb_message.get('riskScore'))
+            is_risky = is_risky_score(fb_message.get('riskScore'))
 
             # Create new message
-            message = Message(
-                firebase_message_id=firebase_message_id,
-                conversation_id=conversation.id,
-                user_id=user.id,
-                text=fb_message.get('text', ''),
-                timestamp=fb_message.get('timestamp'),
-                is_risky=is_risky
-            )
-
-            db.session.add(message)
+            row = {
+                'firebase_message_id': firebase_message_id,
+                'conversation_id': conversation_id,
+                'user_id': user_id,
+                'text': fb_message.get('text', ''),
+                'timestamp': fb_message.get('timestamp'),
+                'is_risky': is_risky,
+                'alert_sent': False
+            }
+            rows_to_insert.append(row)
+            existing_message_ids.add(firebase_message_id)  # never hand the insert a duplicate
             synced_count += 1
 
-            # Send alert if message is risky
             if is_risky:
-                try:
-                    alert_sent = twilio_service.send_risk_alert(
-                        user_firebase_id,
-                        message.text
-                    )
+                risky_rows.append((row, user_firebase_id))
 
-                    if alert_sent:
-                        message.alert_sent = True
-                        alerts_sent += 1
-                        print(f"Risk alert sent for message {firebase_message_id}")
-                except Exception as e:
-                    print(f"Error sending risk alert: {e}")
+        message_ids = self._insert_messages(rows_to_insert)
+
+        # Advance UID watermarks, except for users whose skipped messages must be refetched
+        watermark_users = self._load_users_by_firebase_id(
+            uid for uid in newest_by_uid if uid not in incomplete_uids
+        )
+        for firebase_id, user in watermark_users.items():
+            user.last_message_ts = newest_by_uid[firebase_id]
 
         db.session.commit()
-        print(f"Synced {synced_count} messages, sent {alerts_sent} alerts")
+
+        # Alerts go out after the commit, concurrently, so Twilio latency never holds the
+        # sync transaction open; alert_sent then records which ones were delivered
+        if risky_rows:
+            results = twilio_service.send_risk_alerts(
+                [(user_firebase_id, row['text']) for row, user_firebase_id in risky_rows]
+            )
+            alerted_ids = []
+            for (row, _), alert_sent in zip(risky_rows, results):
+                if alert_sent:
+                    alerted_ids.append(message_ids[row['firebase_message_id']])
+                    logger.info("Risk alert sent for message %s", row['firebase_message_id'])
+            alerts_sent = len(alerted_ids)
+            self._mark_alerts_sent(alerted_ids)
+            db.session.commit()
+        logger.info("Synced %s messages, sent %s alerts", synced_count, alerts_sent)
         return synced_count, alerts_sent
 
     def full_sync(self):
@@ -689,84 +1133,109 @@ class SyncService:
         Perform a full sync of all data.
         Only fetches new messages since last sync to save costs.
         Respects USER_SELECTION_MODE configuration for determining which users to sync.
+        Only one full sync runs at a time; an overlapping call returns without syncing.
         """
+        # flock is held per open file, so this excludes other processes and other threads alike
+        with open(Config.SYNC_LOCK_PATH, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.warning("Another sync is already running, skipping this one")
+                return {
+                    'success': False,
+                    'error': 'Another sync is already in progress'
+                }
+            try:
+                return self._full_sync()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _full_sync(self):
+        """Body of full_sync, run while holding the sync lock"""
         start_time = datetime.utcnow()
-        print(f"Starting full sync at {start_time}")
-        print(f"User selection mode: {Config.USER_SELECTION_MODE}")
+        logger.info("Starting full sync at %s", start_time)
+        logger.info("User selection mode: %s", Config.USER_SELECTION_MODE)
 
         try:
             # Initialize Firebase if not already done
             firebase_service.initialize()
 
-            # Reset all users to inactive before syncing
-            # The sync process will reactivate users that match the current selection mode
-            # This ensures users from a previous mode (e.g., switching from 'uids' to 'redcap')
-            # are properly deactivated
-            deactivated_count = User.query.filter_by(is_active=True).update({'is_active': False})
-            db.session.commit()
-            print(f"Reset {deactivated_count} users to inactive (will reactivate matching users)")
-
             # Sync users based on selection mode
+            # Each sync records the Firebase IDs it activated so users outside the current
+            # selection (e.g., after switching from 'uids' to 'redcap') can be deactivated below
             users_synced = 0
+            activated_ids = set()
 
             if Config.USER_SELECTION_MODE == 'redcap':
                 # Only sync REDCap participants
-                users_synced = self.sync_redcap_participants()
+                users_synced = self.sync_redcap_participants(activated_ids)
 
             elif Config.USER_SELECTION_MODE == 'uids':
                 # Only sync users from Firebase UID list
-                users_synced = self.sync_uid_users()
+                users_synced = self.sync_uid_users(activated_ids)
 
             elif Config.USER_SELECTION_MODE == 'both':
                 # Sync both REDCap participants and UID list
-                redcap_count = self.sync_redcap_participants()
-                uid_count = self.sync_uid_users()
+                redcap_count = self.sync_redcap_participants(activated_ids)
+                uid_count = self.sync_uid_users(activated_ids)
                 users_synced = redcap_count + uid_count
-                print(f"Combined sync: {redcap_count} REDCap users + {uid_count} UID users")
+                logger.info("Combined sync: %s REDCap users + %s UID users", redcap_count, uid_count)
 
             elif Config.USER_SELECTION_MODE == 'all':
                 # Sync all Firebase users without filtering
-                users_synced = self.sync_all_firebase_users()
+                users_synced = self.sync_all_firebase_users(activated_ids)
 
             else:
-                print(f"Warning: Unknown USER_SELECTION_MODE '{Config.USER_SELECTION_MODE}', defaulting to REDCap")
-                users_synced = self.sync_redcap_participants()
-
-            # Then sync Firebase user data for those who have Firebase IDs
-            # (Skip this for 'all' mode since sync_all_firebase_users already does this)
-            if Config.USER_SELECTION_MODE != 'all':
-                firebase_users = firebase_service.get_users()
-                for fb_user in firebase_users:
-                    firebase_id = fb_user.get('firebase_id')
-                    user = User.query.filter_by(firebase_id=firebase_id).first()
-                    if user:
-                        user.current_convo_id = fb_user.get('convoID', '')
-                        user.is_animated = fb_user.get('isAnimate', False)
-                        user.is_dark_mode = fb_user.get('isDark', False)
-                        # Fetch and update identifier from Firebase Authentication
-                        if not user.firebase_id.startswith('redcap_'):
-                            self._fetch_and_update_auth_identifier(user)
-                db.session.commit()
+                logger.warning("Unknown USER_SELECTION_MODE '%s', defaulting to REDCap", Config.USER_SELECTION_MODE)
+                users_synced = self.sync_redcap_participants(activated_ids)
+
+            # Deactivate only the users that dropped out of the selection this pass
+            deactivated_count = self._deactivate_users_except(activated_ids)
+            logger.info("Deactivated %s users no longer matching the selection mode", deactivated_count)
 
             # Get last sync timestamp to only fetch new data
             last_sync_timestamp = self.get_last_sync_timestamp()
 
-            # Sync conversations (only new ones)
-            conversations_synced = self.sync_conversations(last_sync_timestamp)
-
-            # Sync messages
-            # For UID mode, fetch ALL messages for UID users (ignore timestamp)
+            # For UID mode, fetch UID users' messages from their own watermarks (ignore last sync)
             # For redcap and all modes, only fetch new messages since last sync
             uid_list = None
             if Config.USER_SELECTION_MODE in ['uids', 'both']:
                 # Get list of Firebase IDs to fetch all messages for
                 uid_list = [uid for uid in Config.FIREBASE_UIDS if uid]
-                print(f"UID mode active: will fetch ALL messages for {len(uid_list)} UIDs")
+                logger.info("UID mode active: will fetch messages for %s UIDs from per-user watermarks", len(uid_list))
+            messages_since = last_sync_timestamp if Config.USER_SELECTION_MODE in ['redcap', 'all'] else None
+
+            # The Firestore reads are independent, so run them concurrently; the writes below
+            # still happen in order (users, then conversations, then messages)
+            with ThreadPoolExecutor(max_workers=FIREBASE_FETCH_WORKERS) as executor:
+                users_future = None
+                if Config.USER_SELECTION_MODE != 'all':
+                    users_future = executor.submit(firebase_service.get_users_list, fields=FIREBASE_USER_FIELDS)
+                conversations_future = executor.submit(
+                    firebase_service.get_conversations_since_list, last_sync_timestamp
+                )
+                messages_future = None
+                if not uid_list:
+                    messages_future = executor.submit(
+                        firebase_service.get_messages_since_list, messages_since, fields=FIREBASE_MESSAGE_FIELDS
+                    )
 
-            messages_synced, alerts_sent = self.sync_messages(
-                since_timestamp=last_sync_timestamp if Config.USER_SELECTION_MODE in ['redcap', 'all'] else None,
-                uid_list=uid_list
-            )
+                # Then sync Firebase user data for those who have Firebase IDs
+                # (Skip this for 'all' mode since sync_all_firebase_users already does this)
+                if users_future is not None:
+                    self._refresh_firebase_user_fields(users_future.result())
+
+                # Sync conversations (only new ones)
+                conversations_synced = self.sync_conversations(
+                    last_sync_timestamp, conversations=conversations_future.result()
+                )
+
+                # Sync messages
+                messages_synced, alerts_sent = self.sync_messages(
+                    since_timestamp=messages_since,
+                    uid_list=uid_list,
+                    messages=messages_future.result() if messages_future is not None else None
+                )
 
             # Record sync log
             end_time = datetime.utcnow()
@@ -781,9 +1250,12 @@ class SyncService:
             )
             db.session.add(sync_log)
             db.session.commit()
+            # The row just written is the new maximum, so the next run can skip the SELECT
+            self._last_sync_cache = (start_time, time.monotonic())
 
-            print(f"Sync completed in {duration:.2f} seconds")
-            print(f"Users: {users_synced}, Conversations: {conversations_synced}, Messages: {messages_synced}, Alerts: {alerts_sent}")
+            logger.info("Sync completed in %.2f seconds", duration)
+            logger.info("Users: %s, Conversations: %s, Messages: %s, Alerts: %s",
+                        users_synced, conversations_synced, messages_synced, alerts_sent)
 
             return {
                 'success': True,
@@ -795,7 +1267,7 @@ class SyncService:
             }
 
         except Exception as e:
-            print(f"Error during sync: {e}")
+            logger.error("Error during sync: %s", e)
             db.session.rollback()
             return {
                 'success': False,
@@ -1,8 +1,24 @@
 from twilio.rest import Client
 from config import Config
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import pytz
 
+# Risk alerts sent at once when a sync pass flags several messages
+ALERT_SEND_WORKERS = 4
+
+# Shared pool for fanning one alert out to every admin number. Kept separate from the
+# per-alert pool above so an alert waiting on its sends never starves this one.
+_ADMIN_SEND_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+RISK_ALERT_TEMPLATE = (
+    "THERABOT ALERT\n"
+    "Risky message detected!\n\n"
+    "User: {user_firebase_id}\n"
+    "Time: {timestamp}\n\n"
+    "Message: {message_text}"
+)
+
 
 class TwilioService:
     """Service for sending SMS alerts via Twilio"""
@@ -11,8 +27,10 @@ class TwilioService:
         self.account_sid = Config.TWILIO_ACCOUNT_SID
         self.auth_token = Config.TWILIO_AUTH_TOKEN
         self.from_number = Config.TWILIO_FROM_NUMBER
-        self.admin_numbers = Config.TWILIO_ADMIN_NUMBERS
+        # Stripped and filtered once here rather than on every alert
+        self.admin_numbers = tuple(n.strip() for n in Config.TWILIO_ADMIN_NUMBERS if n and n.strip())
         self.client = None
+        self.timezone = pytz.timezone(Config.TIMEZONE)
 
         if self.account_sid and self.auth_token:
             self.client = Client(self.account_sid, self.auth_token)
@@ -21,37 +39,42 @@ class TwilioService:
         """
         Send SMS alert to study admins about risky message.
         """
-        if not self.client or not self.admin_numbers:
-            print("Warning: Twilio not configured or no admin numbers specified")
+        if not self.client:
+            print("Warning: Twilio not configured")
+            return False
+        # admin_numbers is already stripped of blanks, so an all-blank setting bails here
+        # before any timestamp or message formatting
+        if not self.admin_numbers:
+            print("Warning: No admin numbers specified")
             return False
 
         # Get Eastern Time for the alert
-        et_tz = pytz.timezone(Config.TIMEZONE)
-        timestamp_et = datetime.now(et_tz).strftime('%Y-%m-%d %I:%M:%S %p %Z')
+        timestamp_et = datetime.now(self.timezone).strftime('%Y-%m-%d %I:%M:%S %p %Z')
 
         # Construct alert message
-        alert_text = (
-            f"THERABOT ALERT\n"
-            f"Risky message detected!\n\n"
-            f"User: {user_firebase_id}\n"
-            f"Time: {timestamp_et}\n\n"
-            f"Message: {message_text}"
+        alert_text = RISK_ALERT_TEMPLATE.format(
+            user_firebase_id=user_firebase_id,
+            timestamp=timestamp_et,
+            message_text=message_text
         )
 
         success_count = 0
         failed_numbers = []
 
-        # Send to each admin number
-        for admin_number in self.admin_numbers:
-            if not admin_number or admin_number.strip() == '':
-                continue
-
+        # Send to every admin number in parallel over the shared Twilio client
+        futures = {
+            _ADMIN_SEND_EXECUTOR.submit(
+                self.client.messages.create,
+                body=alert_text,
+                from_=self.from_number,
+                to=admin_number
+            ): admin_number
+            for admin_number in self.admin_numbers
+        }
+        for future in as_completed(futures):
+            admin_number = futures[future]
             try:
-                message = self.client.messages.create(
-                    body=alert_text,
-                    from_=self.from_number,
-                    to=admin_number.strip()
-                )
+                message = future.result()
                 print(f"Alert sent to {admin_number}: {message.sid}")
                 success_count += 1
             except Exception as e:
@@ -63,6 +86,29 @@ class TwilioService:
 
         return success_count > 0
 
+    def send_risk_alerts(self, alerts):
+        """
+        Send risk alerts for several messages concurrently.
+        alerts is a list of (user_firebase_id, message_text) pairs. Returns a list of
+        booleans in the same order, True where the alert reached at least one admin.
+        """
+        if not alerts:
+            return []
+
+        results = []
+        with ThreadPoolExecutor(max_workers=ALERT_SEND_WORKERS) as executor:
+            futures = [
+                executor.submit(self.send_risk_alert, user_firebase_id, message_text)
+                for user_firebase_id, message_text in alerts
+            ]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"Error sending risk alert: {e}")
+                    results.append(False)
+        return results
+
     def send_test_message(self, to_number):
         """Send a test message to verify Twilio configuration"""
         if not self.client:
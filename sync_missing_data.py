@@ -15,6 +15,9 @@ Options:
 
 import sys
 import os
+import logging
+import queue
+import threading
 
 # Add the parent directory to the path so we can import from the app
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -23,12 +26,87 @@ from app import app
 from models import db, User, Conversation, Message
 from services.firebase_service import firebase_service
 from services.twilio_service import twilio_service
+from services.sync_service import (
+    INSERT_BATCH_SIZE, UPSERT_INSERTS, _chunked, _select_in_chunks, is_risky_score
+)
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
 
-def find_missing_conversations(dry_run=False):
+# Firebase documents per window when streaming a collection, and windows buffered ahead
+STREAM_WINDOW_SIZE = 1000
+STREAM_QUEUE_WINDOWS = 4
+
+
+def iter_windows(records, size=STREAM_WINDOW_SIZE):
+    """
+    Read records on a background thread and yield them in lists of up to size items.
+    At most STREAM_QUEUE_WINDOWS windows are buffered, so memory stays bounded while
+    the next Firestore pages load during processing.
+    """
+    windows = queue.Queue(maxsize=STREAM_QUEUE_WINDOWS)
+    done = object()
+
+    def produce():
+        try:
+            window = []
+            for record in records:
+                window.append(record)
+                if len(window) >= size:
+                    windows.put(window)
+                    window = []
+            if window:
+                windows.put(window)
+        except Exception as e:
+            windows.put(e)
+            return
+        windows.put(done)
+
+    # Daemon thread so an abandoned stream never keeps the script alive
+    threading.Thread(target=produce, daemon=True).start()
+
+    while True:
+        window = windows.get()
+        if window is done:
+            return
+        if isinstance(window, Exception):
+            raise window
+        yield window
+
+
+def insert_ignoring_duplicates(table, rows, key):
+    """
+    Bulk INSERT rows, skipping any whose unique key already exists (ON CONFLICT DO NOTHING),
+    so a row written by a concurrent sync since the diff can't abort the whole batch.
+    Returns the set of key values actually inserted.
+    """
+    key_column = table.c[key]
+    dialect = db.session.get_bind().dialect
+    insert = UPSERT_INSERTS.get(dialect.name)
+    if insert is not None and dialect.insert_executemany_returning:
+        result = db.session.execute(
+            insert(table).on_conflict_do_nothing(index_elements=[key]).returning(key_column), rows
+        )
+        return {inserted_key for (inserted_key,) in result}
+
+    # No executemany RETURNING: drop rows that exist by now, then insert the rest
+    existing_keys = {
+        existing_key for (existing_key,) in _select_in_chunks([key_column], key_column, (row[key] for row in rows))
+    }
+    rows = [row for row in rows if row[key] not in existing_keys]
+    if rows:
+        if insert is None:
+            db.session.execute(table.insert(), rows)
+        else:
+            db.session.execute(insert(table).on_conflict_do_nothing(index_elements=[key]), rows)
+    return {row[key] for row in rows}
+
+
+def find_missing_conversations(dry_run=False, firebase_convos=None):
     """
     Find conversations in Firebase that are missing from the local database.
+    firebase_convos may be passed in when the caller already fetched them.
     Returns list of missing conversation data.
     """
     print("\n" + "=" * 60)
@@ -36,13 +114,14 @@ def find_missing_conversations(dry_run=False):
     print("=" * 60)
 
     # Get all conversations from Firebase (no timestamp filter)
-    firebase_convos = firebase_service.get_conversations_since(since_timestamp=None)
+    if firebase_convos is None:
+        firebase_convos = firebase_service.get_conversations_since_list(since_timestamp=None)
     print(f"Found {len(firebase_convos)} total conversations in Firebase")
 
-    # Get all conversation IDs from local database
-    local_convo_ids = set(
-        c.firebase_convo_id for c in Conversation.query.all()
-    )
+    # Get all conversation IDs from local database (ID column only, no full rows)
+    local_convo_ids = {
+        firebase_convo_id for (firebase_convo_id,) in db.session.query(Conversation.firebase_convo_id)
+    }
     print(f"Found {len(local_convo_ids)} conversations in local database")
 
     # Find missing conversations
@@ -64,32 +143,40 @@ def find_missing_conversations(dry_run=False):
     return missing_convos
 
 
-def find_missing_messages(dry_run=False):
+def find_missing_messages(dry_run=False, firebase_messages=None):
     """
     Find messages in Firebase that are missing from the local database.
+    firebase_messages may be passed in when the caller already fetched them; otherwise
+    the collection is streamed in windows so only the missing messages are kept in memory.
     Returns list of missing message data.
     """
     print("\n" + "=" * 60)
     print("CHECKING MESSAGES")
     print("=" * 60)
 
-    # Get all messages from Firebase (no timestamp filter)
-    firebase_messages = firebase_service.get_messages_since(since_timestamp=None)
-    print(f"Found {len(firebase_messages)} total messages in Firebase")
-
-    # Get all message IDs from local database
-    local_message_ids = set(
-        m.firebase_message_id for m in Message.query.all()
-    )
+    # Get all message IDs from local database (ID column only, no full rows)
+    local_message_ids = {
+        firebase_message_id for (firebase_message_id,) in db.session.query(Message.firebase_message_id)
+    }
     print(f"Found {len(local_message_ids)} messages in local database")
 
+    # Get all messages from Firebase (no timestamp filter)
+    if firebase_messages is None:
+        windows = iter_windows(firebase_service.get_messages_since(since_timestamp=None))
+    else:
+        windows = [firebase_messages]
+
     # Find missing messages
+    firebase_count = 0
     missing_messages = []
-    for fb_message in firebase_messages:
-        firebase_message_id = fb_message.get('firebase_message_id')
-        if firebase_message_id not in local_message_ids:
-            missing_messages.append(fb_message)
-
+    for window in windows:
+        firebase_count += len(window)
+        for fb_message in window:
+            firebase_message_id = fb_message.get('firebase_message_id')
+            if firebase_message_id not in local_message_ids:
+                missing_messages.append(fb_message)
+
+    print(f"Found {firebase_count} total messages in Firebase")
     print(f"Found {len(missing_messages)} missing messages")
 
     if missing_messages and len(missing_messages) <= 1000:
@@ -123,43 +210,45 @@ def sync_missing_conversations(missing_convos, dry_run=False):
     print(f"\nSyncing {len(missing_convos)} missing conversations...")
     synced_count = 0
     skipped_count = 0
+    queued_count = 0
+    rows_to_insert = []
+
+    # Map every local user's Firebase ID to its id in one query
+    user_ids = dict(db.session.query(User.firebase_id, User.id).all())
 
     for fb_convo in missing_convos:
         firebase_convo_id = fb_convo.get('firebase_convo_id')
         user_firebase_id = fb_convo.get('userID')
 
         # Find the user
-        user = User.query.filter_by(firebase_id=user_firebase_id).first()
-        if not user:
-            print(f"  Warning: User {user_firebase_id} not found for conversation {firebase_convo_id}, skipping")
+        user_id = user_ids.get(user_firebase_id)
+        if not user_id:
+            logger.warning("User %s not found for conversation %s, skipping", user_firebase_id, firebase_convo_id)
             skipped_count += 1
             continue
 
         # Create the conversation (use current time if timestamp missing)
-        convo = Conversation(
-            firebase_convo_id=firebase_convo_id,
-            user_id=user.id,
-            prompt=fb_convo.get('prompt', ''),
-            timestamp=fb_convo.get('timestamp') or datetime.utcnow()
-        )
-        db.session.add(convo)
-        synced_count += 1
-        print(f"  Synced conversation: {firebase_convo_id}")
-
+        rows_to_insert.append({
+            'firebase_convo_id': firebase_convo_id,
+            'user_id': user_id,
+            'prompt': fb_convo.get('prompt', ''),
+            'timestamp': fb_convo.get('timestamp') or datetime.utcnow()
+        })
+        queued_count += 1
+
+        if len(rows_to_insert) >= INSERT_BATCH_SIZE:
+            synced_count += len(insert_ignoring_duplicates(Conversation.__table__, rows_to_insert, 'firebase_convo_id'))
+            rows_to_insert = []
+
+    if rows_to_insert:
+        synced_count += len(insert_ignoring_duplicates(Conversation.__table__, rows_to_insert, 'firebase_convo_id'))
     db.session.commit()
+    if queued_count > synced_count:
+        logger.info("%s conversations were already stored by another sync", queued_count - synced_count)
     print(f"\nSynced {synced_count} conversations ({skipped_count} skipped due to missing users)")
     return synced_count
 
 
-def is_risky(risk_value):
-    """Check if message is risky based on Firebase riskScore field."""
-    if risk_value is None:
-        return False
-    if isinstance(risk_value, str):
-        return risk_value.strip().lower() == "risky"
-    return False
-
-
 def sync_missing_messages(missing_messages, dry_run=False):
     """
     Sync missing messages to the local database.
@@ -173,9 +262,16 @@ def sync_missing_messages(missing_messages, dry_run=False):
         return 0, 0
 
     print(f"\nSyncing {len(missing_messages)} missing messages...")
-    synced_count = 0
     skipped_count = 0
+    queued_count = 0
     alerts_sent = 0
+    rows_to_insert = []
+    inserted_ids = set()  # firebase_message_ids this run actually stored
+    risky_rows = []  # (row, user_firebase_id) pairs alerted on after the commit
+
+    # Map every local conversation and user Firebase ID to its id, one query each
+    conversation_ids = dict(db.session.query(Conversation.firebase_convo_id, Conversation.id).all())
+    user_ids = dict(db.session.query(User.firebase_id, User.id).all())
 
     for fb_message in missing_messages:
         firebase_message_id = fb_message.get('firebase_message_id')
@@ -183,52 +279,74 @@ def sync_missing_messages(missing_messages, dry_run=False):
         user_firebase_id = fb_message.get('userID')
 
         # Find the conversation
-        conversation = Conversation.query.filter_by(firebase_convo_id=convo_id_str).first()
-        if not conversation:
-            print(f"  Warning: Conversation {convo_id_str} not found for message {firebase_message_id}, skipping")
+        conversation_id = conversation_ids.get(convo_id_str)
+        if not conversation_id:
+            logger.warning("Conversation %s not found for message %s, skipping", convo_id_str, firebase_message_id)
             skipped_count += 1
             continue
 
         # Find the user
-        user = User.query.filter_by(firebase_id=user_firebase_id).first()
-        if not user:
-            print(f"  Warning: User {user_firebase_id} not found for message {firebase_message_id}, skipping")
+        user_id = user_ids.get(user_firebase_id)
+        if not user_id:
+            logger.warning("User %s not found for message %s, skipping", user_firebase_id, firebase_message_id)
             skipped_count += 1
             continue
 
         # Check if message is risky
-        risky = is_risky(fb_message.get('riskScore'))
+        risky = is_risky_score(fb_message.get('riskScore'))
 
         # Create the message
-        message = Message(
-            firebase_message_id=firebase_message_id,
-            conversation_id=conversation.id,
-            user_id=user.id,
-            text=fb_message.get('text', ''),
-            timestamp=fb_message.get('timestamp'),
-            is_risky=risky
-        )
-        db.session.add(message)
-        synced_count += 1
+        row = {
+            'firebase_message_id': firebase_message_id,
+            'conversation_id': conversation_id,
+            'user_id': user_id,
+            'text': fb_message.get('text', ''),
+            'timestamp': fb_message.get('timestamp'),
+            'is_risky': risky,
+            'alert_sent': False
+        }
+        queued_count += 1
 
-        # Send alert if message is risky
         if risky:
-            try:
-                alert_sent = twilio_service.send_risk_alert(
-                    user_firebase_id,
-                    message.text
-                )
-                if alert_sent:
-                    message.alert_sent = True
-                    alerts_sent += 1
-                    print(f"  Risk alert sent for message {firebase_message_id}")
-            except Exception as e:
-                print(f"  Error sending risk alert: {e}")
-
-        if synced_count % 100 == 0:
-            print(f"  Progress: {synced_count} messages synced...")
+            risky_rows.append((row, user_firebase_id))
+
+        rows_to_insert.append(row)
+        if len(rows_to_insert) >= INSERT_BATCH_SIZE:
+            inserted_ids.update(insert_ignoring_duplicates(Message.__table__, rows_to_insert, 'firebase_message_id'))
+            rows_to_insert = []
+
+        if queued_count % 1000 == 0:
+            logger.info("Progress: %s messages synced...", queued_count)
 
+    if rows_to_insert:
+        inserted_ids.update(insert_ignoring_duplicates(Message.__table__, rows_to_insert, 'firebase_message_id'))
     db.session.commit()
+
+    # Rows another sync stored in the meantime were ignored; that sync already alerted on them
+    synced_count = len(inserted_ids)
+    if queued_count > synced_count:
+        logger.info("%s messages were already stored by another sync", queued_count - synced_count)
+    risky_rows = [(row, uid) for row, uid in risky_rows if row['firebase_message_id'] in inserted_ids]
+
+    # Send alerts concurrently once the messages are stored, then record which went out
+    if risky_rows:
+        results = twilio_service.send_risk_alerts(
+            [(user_firebase_id, row['text']) for row, user_firebase_id in risky_rows]
+        )
+        alerted_ids = []
+        for (row, _), alert_sent in zip(risky_rows, results):
+            if alert_sent:
+                alerted_ids.append(row['firebase_message_id'])
+                logger.debug("Risk alert sent for message %s", row['firebase_message_id'])
+        alerts_sent = len(alerted_ids)
+
+        messages = Message.__table__
+        for chunk in _chunked(alerted_ids):
+            db.session.execute(
+                messages.update().where(messages.c.firebase_message_id.in_(chunk)).values(alert_sent=True)
+            )
+        db.session.commit()
+
     print(f"\nSynced {synced_count} messages ({skipped_count} skipped)")
     if alerts_sent > 0:
         print(f"Sent {alerts_sent} risk alerts")
@@ -253,9 +371,12 @@ def main():
         print("\nInitializing Firebase...")
         firebase_service.initialize()
 
-        # Find missing data
-        missing_convos = find_missing_conversations(dry_run)
-        missing_messages = find_missing_messages(dry_run)
+        # Find missing data. Conversations load in the background while the much larger
+        # messages collection is streamed and diffed window by window.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            convos_future = executor.submit(firebase_service.get_conversations_since_list, since_timestamp=None)
+            missing_messages = find_missing_messages(dry_run)
+            missing_convos = find_missing_conversations(dry_run, firebase_convos=convos_future.result())
 
         # Summary before sync
         print("\n" + "=" * 60)